@@ -0,0 +1,149 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from event_logs import DayGrid, event_days, event_files, event_keys, read_event_chunks
+from utils import write_csv_atomic
+
+# Replays the VariableDebtToken Mint/Burn and ReserveDataUpdated logs that
+# sql/figure3_dune_aave_*_debt_outstanding.sql reads on Dune
+AAVE_PROTOCOLS = {
+    "aave_v2": {"burn_amount": "amount"},
+    "aave_v3": {"burn_amount": "value"},
+}
+RAY = 1e27
+
+
+class DailyDebtState:
+    def __init__(self, n_reserves):
+        self.grid = DayGrid(
+            n_reserves,
+            {
+                "scaled": ("float64", 0.0),
+                "touched": ("bool", False),
+                "borrow_index": ("float64", np.nan),
+                "index_key": ("int64", -1),
+            },
+        )
+
+    def add_debt_changes(self, reserve_ids, days, scaled_changes):
+        columns = self.grid.ensure_days(days)
+        np.add.at(self.grid["scaled"], (reserve_ids, columns), scaled_changes)
+        self.grid["touched"][reserve_ids, columns] = True
+
+    def set_borrow_index(self, reserve_ids, days, keys, borrow_index):
+        columns = self.grid.ensure_days(days)
+        # Keep only the latest event per reserve and day, in this chunk and overall
+        order = np.lexsort((keys, columns, reserve_ids))
+        reserve_ids, columns = reserve_ids[order], columns[order]
+        keys, borrow_index = keys[order], borrow_index[order]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (reserve_ids[1:] != reserve_ids[:-1]) | (
+            columns[1:] != columns[:-1]
+        )
+        reserve_ids, columns = reserve_ids[last], columns[last]
+        keys, borrow_index = keys[last], borrow_index[last]
+        newer = keys > self.grid["index_key"][reserve_ids, columns]
+        self.grid["index_key"][reserve_ids[newer], columns[newer]] = keys[newer]
+        self.grid["borrow_index"][reserve_ids[newer], columns[newer]] = borrow_index[
+            newer
+        ]
+
+    def daily_debt(self, symbols):
+        frames = []
+        for reserve_id, symbol in enumerate(symbols):
+            touched = self.grid["touched"][reserve_id]
+            if not touched.any():
+                continue
+            total_scaled = np.cumsum(self.grid["scaled"][reserve_id])[touched]
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "symbol": symbol,
+                        "ds": self.grid.dates(np.flatnonzero(touched)),
+                        "current_variable_debt": total_scaled
+                        * self.grid["borrow_index"][reserve_id][touched]
+                        / RAY,
+                    }
+                )
+            )
+        if not frames:
+            return pd.DataFrame(columns=["symbol", "ds", "current_variable_debt"])
+        daily = pd.concat(frames, ignore_index=True)
+        return daily.sort_values(by=["symbol", "ds"], ignore_index=True)
+
+
+def replay_debt_outstanding(
+    protocol, events_dir, symbols=("USDC", "USDT"), chunksize=1_000_000
+):
+    burn_amount = AAVE_PROTOCOLS[protocol]["burn_amount"]
+
+    # reserves.csv: ReserveInitialized joined with token symbol and decimals
+    reserves = pd.read_csv(os.path.join(events_dir, "reserves.csv"))
+    reserves = reserves.loc[reserves["symbol"].isin(symbols)].reset_index(drop=True)
+    reserve_symbols = reserves["symbol"].tolist()
+    debt_token_ids = pd.Index(reserves["variableDebtToken"].str.lower())
+    asset_ids = pd.Index(reserves["asset"].str.lower())
+    decimals = 10.0 ** reserves["decimals"].to_numpy(dtype="float64")
+    state = DailyDebtState(len(reserves))
+
+    base_columns = ["contract_address", "evt_block_time", "index"]
+    for table, amount, sign in [("mint", "value", 1.0), ("burn", burn_amount, -1.0)]:
+        for chunk in read_event_chunks(
+            event_files(events_dir, table), base_columns + [amount], chunksize
+        ):
+            reserve_ids = debt_token_ids.get_indexer(
+                chunk["contract_address"].str.lower()
+            )
+            known = reserve_ids >= 0
+            chunk, reserve_ids = chunk.loc[known], reserve_ids[known]
+            if not len(chunk):
+                continue
+            raw_change = sign * chunk[amount].to_numpy(dtype="float64")
+            scaled_change = (
+                raw_change
+                / decimals[reserve_ids]
+                / chunk["index"].to_numpy(dtype="float64")
+                * RAY
+            )
+            state.add_debt_changes(
+                reserve_ids, event_days(chunk["evt_block_time"]), scaled_change
+            )
+
+    index_columns = [
+        "reserve",
+        "evt_block_number",
+        "evt_index",
+        "evt_block_time",
+        "variableBorrowIndex",
+    ]
+    for chunk in read_event_chunks(
+        event_files(events_dir, "reserve_data_updated"), index_columns, chunksize
+    ):
+        reserve_ids = asset_ids.get_indexer(chunk["reserve"].str.lower())
+        known = reserve_ids >= 0
+        chunk, reserve_ids = chunk.loc[known], reserve_ids[known]
+        if not len(chunk):
+            continue
+        state.set_borrow_index(
+            reserve_ids,
+            event_days(chunk["evt_block_time"]),
+            event_keys(chunk),
+            chunk["variableBorrowIndex"].to_numpy(dtype="float64"),
+        )
+
+    return state.daily_debt(reserve_symbols)
+
+
+def write_debt_outstanding(protocol, events_dir, **kwargs):
+    daily = replay_debt_outstanding(protocol, events_dir, **kwargs)
+    daily["ds"] = daily["ds"].dt.strftime("%Y-%m-%d")
+    write_csv_atomic(daily, f"../data/{protocol}.csv", index=False)
+    return daily
+
+
+if __name__ == "__main__":
+    # python aave_replay.py aave_v2 path/to/aave_v2_events
+    write_debt_outstanding(sys.argv[1], sys.argv[2])
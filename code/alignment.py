@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from tracing import span
+
+# Series at different native frequencies (daily CMC, business-day repo and
+# SPX, weekly M2, annual survey values) are put on one target calendar by
+# binary search. Each column is looked up among its own non-missing
+# observations under a fill policy:
+#   "exact"  the value dated on the target day
+#   "ffill"  the last value on or before the day
+#   "bfill"  the first value on or after the day
+# A tuple of policies is tried in order, e.g. ("bfill", "ffill")
+POLICIES = ["exact", "ffill", "bfill"]
+
+
+def as_of(dates, targets, policy="exact", tolerance=None):
+    # Position in the sorted dates for each target, or -1 where the policy
+    # finds no observation (or none within tolerance)
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown fill policy: {policy}")
+    if not len(dates):
+        return np.full(len(targets), -1)
+    if policy == "exact":
+        positions = np.searchsorted(dates, targets)
+    elif policy == "ffill":
+        positions = np.searchsorted(dates, targets, "right") - 1
+    else:
+        positions = np.searchsorted(dates, targets)
+    found = (positions >= 0) & (positions < len(dates))
+    positions = positions.clip(0, len(dates) - 1)
+    if policy == "exact":
+        found &= dates[positions] == targets
+    if tolerance is not None:
+        found &= np.abs(dates[positions] - targets) <= tolerance
+    return np.where(found, positions, -1)
+
+
+def _keys(dates, freq):
+    # Dates, or period numbers when matching on e.g. the year ("Y")
+    dates = pd.DatetimeIndex(dates)
+    if freq is None:
+        return dates.to_numpy(dtype="datetime64[ns]")
+    return dates.to_period(freq).asi8
+
+
+def _columns(frame):
+    # (dates, {column: float64 values}) from a TimeSeries, DataFrame or Series
+    if hasattr(frame, "dates"):
+        return frame.dates, frame.columns
+    if isinstance(frame, pd.Series):
+        frame = frame.to_frame()
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+    return frame.index, {c: frame[c].to_numpy(dtype="float64") for c in frame.columns}
+
+
+def _fill(keys, values, targets, policies, tolerance):
+    valid = ~np.isnan(values)
+    keys, values = keys[valid], values[valid]
+    result = np.full(len(targets), np.nan)
+    missing = np.arange(len(targets))
+    for policy in [policies] if isinstance(policies, str) else policies:
+        positions = as_of(keys, targets[missing], policy, tolerance)
+        hit = positions >= 0
+        result[missing[hit]] = values[positions[hit]]
+        missing = missing[~hit]
+    return result
+
+
+def align_to(calendar, frames, fill="exact", tolerance=None, freq=None):
+    # One DataFrame on the calendar with every column of the frames. fill is
+    # a policy for all columns or a {column: policy} dict (default "exact").
+    # With freq, dates match on periods, so freq="Y" joins annual values by
+    # year and tolerance counts periods rather than a Timedelta
+    index = pd.DatetimeIndex(calendar)
+    targets = _keys(index, freq)
+    if tolerance is not None and freq is None:
+        tolerance = pd.Timedelta(tolerance).to_timedelta64()
+    with span("align", rows=len(index), freq=freq) as s:
+        columns = {}
+        for frame in frames:
+            dates, values = _columns(frame)
+            keys = _keys(dates, freq)
+            for name, column in values.items():
+                policies = fill.get(name, "exact") if isinstance(fill, dict) else fill
+                columns[name] = _fill(keys, column, targets, policies, tolerance)
+        s.set(columns=len(columns))
+    return pd.DataFrame(columns, index=index)
@@ -0,0 +1,268 @@
+import argparse
+import importlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+
+import store
+import utils
+from build_all import FIGURES, load_declared_input, resolve_inputs
+from figures import REPO_MNEMONICS
+
+BASELINE_PATH = "benchmark_baseline.json"
+# Copied into the fixture folder; everything else is synthetic
+FIXTURE_FILES = ["aave_v2", "aave_v3", "compound_v2", "other_data_source"]
+HISTORY_START = pd.Timestamp("2018-10-01")
+HISTORY_END = pd.Timestamp("2023-04-30")
+
+
+def _history(scale, freq="D"):
+    # Scaled variants extend the history backwards
+    start = HISTORY_END - (HISTORY_END - HISTORY_START) * scale
+    return pd.date_range(start, HISTORY_END, freq=freq)
+
+
+def _random_walk(rng, n, start, drift=0.0005, scale=0.02):
+    return start * np.exp(np.cumsum(rng.normal(drift, scale, n)))
+
+
+def write_fixtures(data_dir, scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    days = _history(scale)
+    for symbol, market_cap in [("USDC", 4e10), ("USDT", 7e10), ("BUSD", 1e10)]:
+        pd.DataFrame(
+            {
+                f"{symbol}_volume": _random_walk(rng, len(days), market_cap * 0.2),
+                f"{symbol}_market_cap": _random_walk(rng, len(days), market_cap),
+            },
+            index=days,
+        ).to_csv(os.path.join(data_dir, f"{symbol}_data.csv"))
+
+    for name in FIXTURE_FILES:
+        df = pd.read_csv(os.path.join(store.DATA_DIR, f"{name}.csv"))
+        if name != "other_data_source" and scale > 1:
+            # Other lending markets that the loader has to read past
+            extra = [
+                df.assign(symbol=f"SYN{i}", current_variable_debt=df.iloc[:, 2] * i)
+                for i in range(1, int(scale))
+            ]
+            df = pd.concat([df] + extra, ignore_index=True)
+        df.to_csv(os.path.join(data_dir, f"{name}.csv"), index=False)
+
+
+def fetch_stand_ins(scale=1, seed=0):
+    # FRED and OFR responses served from memory instead of the network
+    rng = np.random.default_rng(seed)
+    days = _history(scale)
+    business_days = _history(scale, "B")
+    weeks = _history(scale, "W-MON")
+    quarters = _history(scale, "QS")
+    fred = {
+        "WM2NS": pd.Series(_random_walk(rng, len(weeks), 2e4, 0.001, 0.003), weeks),
+        "SP500": pd.Series(_random_walk(rng, len(business_days), 3e3), business_days),
+        "CBBTCUSD": pd.Series(_random_walk(rng, len(days), 1e4, 0.001, 0.04), days),
+        "GDP": pd.Series(_random_walk(rng, len(quarters), 2e4, 0.01, 0.01), quarters),
+    }
+    stand_ins = {}
+    for series, values in fred.items():
+        frame = values.to_frame(series)
+        frame.index.name = "DATE"
+        stand_ins[("fred", series)] = frame
+    stand_ins[("ofr", REPO_MNEMONICS)] = pd.DataFrame(
+        {
+            column: _random_walk(rng, len(business_days), 1e12, 0.0, 0.01)
+            for column in ["tri value", "dvp value", "gcf value"]
+        },
+        index=pd.DatetimeIndex(business_days, name="date"),
+    )
+    return stand_ins
+
+
+def _measure(fn, repeat, trace_memory, setup=None):
+    # Wall time of each repeat, and peak traced memory from one extra run.
+    # setup runs before every call, outside the timed region
+    seconds = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    peak = None
+    if trace_memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def calibrate(repeat=5):
+    # A fixed numpy/pandas/Python workload. Stage times are compared as
+    # multiples of it, so a slower or busier machine is not a regression
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(size=(100_000, 4)))
+
+    def work():
+        frame.rolling(30).mean().cumsum().abs().max()
+        sum(i * i for i in range(200_000))
+
+    seconds, _ = _measure(work, repeat, False)
+    return statistics.median(seconds)
+
+
+def benchmark(figure_names=None, scale=1, repeat=5, seed=0):
+    figure_names = list(FIGURES) if figure_names is None else figure_names
+    fixture_dir = tempfile.mkdtemp(prefix="benchmark_")
+    data_dir, store_dir = store.DATA_DIR, store.STORE_DIR
+    savefig = Figure.savefig
+    render = {}
+
+    def timed_savefig(fig, fname, *args, **kwargs):
+        # Figures are written to the fixture folder, never to ../output
+        start = time.perf_counter()
+        fname = os.path.join(fixture_dir, os.path.basename(fname))
+        savefig(fig, fname, *args, **kwargs)
+        render["seconds"] = time.perf_counter() - start
+
+    results = {"calibration": {"seconds": calibrate(repeat), "peak_bytes": None}}
+    try:
+        write_fixtures(fixture_dir, scale, seed)
+        store.DATA_DIR = fixture_dir
+        store.STORE_DIR = os.path.join(fixture_dir, "store")
+        Figure.savefig = timed_savefig
+
+        stand_ins = fetch_stand_ins(scale, seed)
+        for name in figure_names:
+            spec = FIGURES[name]
+            plot = getattr(importlib.import_module(spec["module"]), spec["function"])
+            loads, fields = resolve_inputs([name])
+
+            def load():
+                utils.reset_inputs()
+                for (provider, series), data in stand_ins.items():
+                    utils.preload_fetch(provider, series, data)
+                for (kind, key), date_range in loads.items():
+                    load_declared_input(kind, key, date_range, fields)
+
+            def run():
+                plot(**spec["kwargs"])
+
+            # Medians over repeats, which are steadier than a single best run
+            seconds, peak = _measure(load, repeat, True)
+            results[f"{name}:load"] = {
+                "seconds": statistics.median(seconds),
+                "peak_bytes": peak,
+            }
+            render_seconds = []
+
+            def run_and_record():
+                run()
+                render_seconds.append(render.get("seconds", 0.0))
+
+            # Inputs are reloaded before every repeat so each one pays the
+            # cold cost of the memoized intermediates (indexes, panels)
+            seconds, peak = _measure(run_and_record, repeat, True, setup=load)
+            render_seconds = render_seconds[:repeat]
+            results[f"{name}:compute"] = {
+                "seconds": statistics.median(
+                    max(s - r, 0.0) for s, r in zip(seconds, render_seconds)
+                ),
+                "peak_bytes": peak,
+            }
+            results[f"{name}:render"] = {
+                "seconds": statistics.median(render_seconds),
+                "peak_bytes": None,
+            }
+    finally:
+        Figure.savefig = savefig
+        store.DATA_DIR, store.STORE_DIR = data_dir, store_dir
+        utils.reset_inputs()
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance=1.0):
+    # Seconds are compared relative to each run's calibration loop
+    old_unit = baseline["calibration"]["seconds"]
+    new_unit = results["calibration"]["seconds"]
+    regressions = []
+    for stage, result in results.items():
+        if stage not in baseline or stage == "calibration":
+            continue
+        for metric in ["seconds", "peak_bytes"]:
+            old, new = baseline[stage].get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "seconds":
+                old, new = old / old_unit, new / new_unit
+            # Ignore noise on stages that take under 20 milliseconds
+            floor = 2e-2 / old_unit if metric == "seconds" else 1024
+            if new > max(old, floor) * (1 + tolerance):
+                unit = "x calibration" if metric == "seconds" else "bytes"
+                regressions.append(f"{stage} {metric}: {old:.4g} -> {new:.4g} ({unit})")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'stage':<28}{'seconds':>10}{'peak MB':>10}")
+    for stage, result in results.items():
+        peak = result["peak_bytes"]
+        peak = "" if peak is None else f"{peak / 2**20:.1f}"
+        print(f"{stage:<28}{result['seconds']:>10.4f}{peak:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("figures", nargs="*", default=None)
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.0)
+    args = parser.parse_args()
+
+    results = benchmark(args.figures or None, args.scale, args.repeat)
+    print_results(results)
+    baseline_key = f"scale={args.scale:g}"
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.record:
+        baseline[baseline_key] = results
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1)
+        print(f"Baseline written to {args.baseline}")
+    elif "calibration" not in baseline.get(baseline_key, {}):
+        # A missing baseline must not pass the regression gate silently.
+        # Baselines are per machine and not committed
+        print(
+            f"No {baseline_key} baseline in {args.baseline}. Record one on "
+            f"this machine first with: python benchmark.py --record "
+            f"--scale {args.scale:g}",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+    else:
+        regressions = compare(results, baseline[baseline_key], args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("No regressions against baseline")
@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tracing import span
+
+# Block bootstrap for the headline ratios. Daily and weekly series are
+# autocorrelated, so each resample is built from runs of consecutive
+# observations (circular blocks) rather than independent draws
+N_RESAMPLES = 10_000
+# Resamples drawn per index matrix, bounding memory; each chunk has its own
+# seed, so results do not depend on how chunks are spread over processes
+CHUNK_RESAMPLES = 1000
+
+
+def block_length(n):
+    # n^(1/3), the usual rate for the block bootstrap of a mean
+    return max(1, int(round(n ** (1 / 3))))
+
+
+def block_indices(n, n_resamples, length, rng):
+    # (n_resamples, n) positions: random block starts, each followed by the
+    # next length - 1 positions, wrapping around the end
+    n_blocks = -(-n // length)
+    starts = rng.integers(0, n, size=(n_resamples, n_blocks))
+    positions = starts[:, :, None] + np.arange(length)
+    return positions.reshape(n_resamples, -1)[:, :n] % n
+
+
+def _mean(samples):
+    return samples.mean(axis=1)
+
+
+def _corr(samples):
+    # Pearson correlation of the two columns of every resample
+    centered = samples - samples.mean(axis=1, keepdims=True)
+    x, y = centered[..., 0], centered[..., 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+
+
+STATISTICS = {"mean": _mean, "corr": _corr}
+
+
+def _resample(values, statistic, n_resamples, length, seed):
+    rng = np.random.default_rng(seed)
+    positions = block_indices(len(values), n_resamples, length, rng)
+    return STATISTICS[statistic](values[positions])
+
+
+def bootstrap(
+    values,
+    statistic="mean",
+    n_resamples=N_RESAMPLES,
+    length=None,
+    seed=0,
+    max_workers=None,
+):
+    # The statistic on every resample. values is one column for "mean" or two
+    # for "corr"; rows with a missing value are dropped first, as pandas does
+    values = np.asarray(values, dtype="float64")
+    missing = np.isnan(values)
+    values = values[~(missing if values.ndim == 1 else missing.any(axis=1))]
+    if not len(values):
+        return np.full(n_resamples, np.nan)
+    length = block_length(len(values)) if length is None else length
+    sizes = [
+        min(CHUNK_RESAMPLES, n_resamples - i)
+        for i in range(0, n_resamples, CHUNK_RESAMPLES)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [(values, statistic, size, length, s) for size, s in zip(sizes, seeds)]
+    with span("bootstrap", statistic=statistic, rows=len(values)) as s:
+        if max_workers is None or max_workers <= 1:
+            results = [_resample(*chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers) as executor:
+                results = list(executor.map(_resample, *zip(*chunks)))
+        s.set(resamples=n_resamples, block_length=length)
+    return np.concatenate(results)
+
+
+def confidence_interval(values, statistic="mean", confidence=0.95, **kwargs):
+    # Percentile interval of the bootstrap distribution
+    estimates = bootstrap(values, statistic, **kwargs)
+    alpha = (1 - confidence) / 2
+    if np.isnan(estimates).all():
+        return np.nan, np.nan
+    low, high = np.nanpercentile(estimates, [100 * alpha, 100 * (1 - alpha)])
+    return low, high
+
+
+def error_bars(estimates, intervals):
+    # yerr for Axes.bar: distance from each bar down and up to its interval
+    estimates = np.asarray(estimates, dtype="float64")
+    low, high = np.asarray(intervals, dtype="float64").T
+    return np.vstack([estimates - low, high - estimates]).clip(min=0)
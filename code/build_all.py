@@ -0,0 +1,226 @@
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import tracing
+from figures import FIGURES
+from timeseries import TimeSeries
+from tracing import span
+from utils import (
+    fetch_cmc_series,
+    fetch_fred_data,
+    fetch_repo_market_data,
+    read_field_index,
+    read_lending_pool_data,
+)
+
+# Content hash of each output's code, arguments and inputs at its last build
+MANIFEST_PATH = "../output/build_manifest.json"
+
+
+def resolve_inputs(figure_names):
+    # Collapse the declared inputs into one load per distinct input,
+    # widening date ranges so every figure's range is a sub-range
+    loads = {}
+    fields = set()
+    for name in figure_names:
+        for kind, key, *date_range in FIGURES[name]["inputs"]:
+            if kind == "other_data_source":
+                fields.add(key)
+                loads[(kind, "other_data_source")] = None
+            elif date_range:
+                start_date, end_date = date_range
+                if (kind, key) in loads:
+                    start_date = min(start_date, loads[(kind, key)][0])
+                    end_date = max(end_date, loads[(kind, key)][1])
+                loads[(kind, key)] = (start_date, end_date)
+            else:
+                loads[(kind, key)] = None
+    return loads, fields
+
+
+def load_declared_input(kind, key, date_range, fields):
+    with span("load_input", kind=kind, key=key):
+        return _load_declared_input(kind, key, date_range, fields)
+
+
+def _load_declared_input(kind, key, date_range, fields):
+    if kind == "cmc":
+        return fetch_cmc_series(key)
+    elif kind == "fred":
+        return fetch_fred_data(key, *date_range)
+    elif kind == "ofr":
+        return fetch_repo_market_data(*[d.strftime("%Y-%m-%d") for d in date_range])
+    elif kind == "lending_pools":
+        return read_lending_pool_data()
+    elif kind == "other_data_source":
+        index = read_field_index()
+        missing = {field for field in fields if field not in index}
+        if missing:
+            raise KeyError(f"Fields missing from other_data_source: {sorted(missing)}")
+        return index
+    raise ValueError(f"Unknown input kind: {kind}")
+
+
+def local_modules(module_name, found=None):
+    # The module and every module it imports from this folder, transitively
+    found = set() if found is None else found
+    path = f"{module_name}.py"
+    if module_name in found or not os.path.exists(path):
+        return found
+    found.add(module_name)
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            local_modules(name.split(".")[0], found)
+    return found
+
+
+def figure_inputs(name, kwargs):
+    # Declared inputs, with date ranges moved along with the figure's own
+    # start and end dates for per-period variants
+    spec = FIGURES[name]
+    for kind, key, *date_range in spec["inputs"]:
+        if date_range and "start_date" in kwargs:
+            date_range = [
+                kwargs["start_date"] + (date_range[0] - spec["kwargs"]["start_date"]),
+                kwargs["end_date"] + (date_range[1] - spec["kwargs"]["end_date"]),
+            ]
+        yield kind, key, date_range
+
+
+def frame_hash(df):
+    digest = hashlib.sha1(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def window_rows(data, start_date, end_date):
+    # The rows dated inside a declared window; CMC series and the lending
+    # pools are loaded whole, so rows outside it are dropped here
+    if isinstance(data, TimeSeries):
+        return data.slice(start_date, end_date).to_frame()
+    if "ds" in data.columns:
+        return data.loc[data["ds"].between(start_date, end_date)]
+    return data.loc[start_date:end_date]
+
+
+def input_hash(kind, key, date_range):
+    if kind == "other_data_source":
+        # Only the rows of the declared field, so edits to others do not count
+        return frame_hash(read_field_index().series(key).to_frame())
+    data = _load_declared_input(kind, key, date_range or None, set())
+    # Only the rows in the figure's window, so rows appended after it (or
+    # edited before it) do not count
+    if date_range:
+        return frame_hash(window_rows(data, *date_range))
+    if isinstance(data, TimeSeries):
+        data = data.to_frame()
+    return frame_hash(data)
+
+
+def figure_hash(name, kwargs):
+    digest = hashlib.sha1(repr(sorted(kwargs.items())).encode())
+    for module_name in sorted(local_modules(FIGURES[name]["module"])):
+        with open(f"{module_name}.py", "rb") as f:
+            digest.update(f.read())
+    for kind, key, date_range in figure_inputs(name, kwargs):
+        digest.update(input_hash(kind, key, date_range).encode())
+    return digest.hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def is_current(manifest, path, digest):
+    return manifest.get(path) == digest and os.path.exists(path)
+
+
+def build_all(figure_names=None, max_workers=8, force=False):
+    figure_names = list(FIGURES) if figure_names is None else figure_names
+    build_start = time.perf_counter()
+
+    # Load every distinct input once; network and disk reads overlap in threads
+    loads, fields = resolve_inputs(figure_names)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(load_declared_input, kind, key, date_range, fields)
+            for (kind, key), date_range in loads.items()
+        ]
+        for future in futures:
+            future.result()
+    load_time = time.perf_counter() - build_start
+    print(f"Loaded {len(loads)} inputs in {load_time:.2f}s")
+
+    # Plotting functions now read the shared inputs from memory; figures whose
+    # code, arguments and inputs hash as at their last build are skipped
+    manifest = load_manifest()
+    built = 0
+    for name in figure_names:
+        spec = FIGURES[name]
+        figure_start = time.perf_counter()
+        module = importlib.import_module(spec["module"])
+        digest = figure_hash(name, spec["kwargs"])
+        if not force and is_current(manifest, module.OUTPUT_PATH, digest):
+            print(f"Skipped {name}, unchanged")
+            continue
+        with span("figure", figure=name):
+            getattr(module, spec["function"])(**spec["kwargs"])
+        manifest[module.OUTPUT_PATH] = digest
+        save_manifest(manifest)
+        built += 1
+        print(f"Built {name} in {time.perf_counter() - figure_start:.2f}s")
+
+    print(
+        f"Built {built} of {len(figure_names)} figures in "
+        f"{time.perf_counter() - build_start:.2f}s"
+    )
+
+
+def traced_build(
+    figure_names=None, trace=None, trace_memory=False, max_workers=8, force=False
+):
+    if trace or trace_memory:
+        tracing.enable(trace_memory=trace_memory)
+    build_all(figure_names, max_workers, force)
+    if tracing.enabled():
+        tracing.print_summary()
+    if trace:
+        tracing.write_chrome_trace(trace)
+        print(f"Trace written to {trace}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("figures", nargs="*", default=None)
+    parser.add_argument("--trace", help="write a Chrome trace JSON to this path")
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--force", action="store_true", help="rebuild every figure")
+    args = parser.parse_args()
+    traced_build(args.figures or None, args.trace, args.trace_memory, force=args.force)
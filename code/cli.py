@@ -0,0 +1,142 @@
+import time
+
+_start = time.perf_counter()
+
+import argparse
+import datetime
+import sys
+
+from figures import FIGURES
+
+# Scheduled jobs run many short invocations, so heavy modules (pandas,
+# matplotlib, requests) are imported inside the subcommand that needs them
+STARTUP_BUDGET_SECONDS = 2.0
+
+
+def report_startup(budget):
+    # Time from interpreter handing control to this script until work starts
+    elapsed = time.perf_counter() - _start
+    over = " (over budget)" if elapsed > budget else ""
+    print(f"Startup {elapsed:.3f}s, budget {budget:.3f}s{over}", file=sys.stderr)
+    return elapsed <= budget
+
+
+def list_figures(args):
+    report_startup(args.startup_budget)
+    for name, spec in FIGURES.items():
+        inputs = ", ".join(f"{kind}:{key}" for kind, key, *_ in spec["inputs"])
+        print(f"{name:<18}{spec['module']}.{spec['function']}")
+        print(f"{'':<18}{inputs}")
+
+
+def build(args):
+    from build_all import traced_build
+
+    report_startup(args.startup_budget)
+    traced_build(
+        args.figures or None,
+        args.trace,
+        args.trace_memory,
+        args.max_workers,
+        args.force,
+    )
+
+
+def build_figure(args):
+    args.figures = [args.command]
+    build(args)
+
+
+def render(args):
+    from render import render_figures
+
+    report_startup(args.startup_budget)
+    periods = [
+        tuple(datetime.datetime.fromisoformat(d) for d in period.split(":"))
+        for period in args.period
+    ]
+    render_figures(args.figures or None, periods, args.processes, args.force)
+
+
+def fetch(args):
+    # CMC downloads are the only command that needs api_key.py
+    from utils import download_data
+
+    report_startup(args.startup_budget)
+    download_data(
+        args.start_date,
+        args.end_date,
+        args.symbols or None,
+        args.max_workers,
+        args.incremental,
+    )
+
+
+def monitor(args):
+    from streaming import STATE_PATH, update_metrics
+
+    report_startup(args.startup_budget)
+    values = update_metrics(args.end_date, args.state or STATE_PATH)
+    for name, value in values.items():
+        print(f"{name:<28}{value:.6f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_SECONDS)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list figures and their inputs").set_defaults(
+        run=list_figures
+    )
+
+    build_parser = commands.add_parser("build", help="build figures")
+    build_parser.add_argument("figures", nargs="*", help="default: all figures")
+    build_parser.set_defaults(run=build)
+    for name in FIGURES:
+        figure_parser = commands.add_parser(name, help=f"build {name} only")
+        figure_parser.set_defaults(run=build_figure)
+    for command_parser in [build_parser] + [commands.choices[n] for n in FIGURES]:
+        command_parser.add_argument("--trace", help="write a Chrome trace JSON")
+        command_parser.add_argument("--trace-memory", action="store_true")
+        command_parser.add_argument("--max-workers", type=int, default=8)
+        command_parser.add_argument("--force", action="store_true")
+
+    render_parser = commands.add_parser(
+        "render", help="render figures in parallel worker processes"
+    )
+    render_parser.add_argument("figures", nargs="*", help="default: all figures")
+    render_parser.add_argument(
+        "--period",
+        action="append",
+        default=[],
+        help="extra START:END variant of every dated figure, e.g. 2022-01-01:2022-12-31",
+    )
+    render_parser.add_argument("--processes", type=int, default=None)
+    render_parser.add_argument("--force", action="store_true")
+    render_parser.set_defaults(run=render)
+
+    fetch_parser = commands.add_parser("fetch", help="download CMC histories")
+    fetch_parser.add_argument("symbols", nargs="*")
+    fetch_parser.add_argument("--incremental", action="store_true")
+    fetch_parser.add_argument("--start-date")
+    fetch_parser.add_argument("--end-date")
+    fetch_parser.add_argument("--max-workers", type=int, default=4)
+    fetch_parser.set_defaults(run=fetch)
+
+    monitor_parser = commands.add_parser(
+        "monitor", help="update the streaming headline metrics with new rows"
+    )
+    monitor_parser.add_argument("--end-date", help="default: today")
+    monitor_parser.add_argument("--state", help="accumulator JSON to update")
+    monitor_parser.set_defaults(run=monitor)
+
+    args = parser.parse_args(argv)
+    unknown = set(getattr(args, "figures", None) or []) - set(FIGURES)
+    if args.command in ["build", "render"] and unknown:
+        parser.error(f"unknown figures: {', '.join(sorted(unknown))}")
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from event_logs import DayGrid, event_days, event_files, event_keys, read_event_chunks
+from utils import write_csv_atomic
+
+# Reduces cToken AccrueInterest logs to the last totalBorrows per token and day
+ACCRUE_INTEREST_COLUMNS = [
+    "contract_address",
+    "evt_block_number",
+    "evt_index",
+    "evt_block_time",
+    "totalBorrows",
+]
+DEFAULT_CHECKPOINT = "../data/compound_v2_checkpoint.npz"
+
+
+class DailyBorrowsState:
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.last_block = -1
+        self.grid = DayGrid(
+            len(self.tokens),
+            {"key": ("int64", -1), "total_borrows": ("float64", np.nan)},
+        )
+
+    def update(self, token_ids, days, keys, total_borrows):
+        columns = self.grid.ensure_days(days)
+        flat = token_ids * self.grid.n_days + columns
+        key_flat = self.grid["key"].reshape(-1)
+        # Single pass: keep the largest (block, log index) key per cell,
+        # then write the values of the events that hold it
+        np.maximum.at(key_flat, flat, keys)
+        latest = keys == key_flat[flat]
+        self.grid["total_borrows"].reshape(-1)[flat[latest]] = total_borrows[latest]
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            tokens=np.array(self.tokens),
+            first_day=-1 if self.grid.first_day is None else self.grid.first_day,
+            last_block=self.last_block,
+            key=self.grid["key"],
+            total_borrows=self.grid["total_borrows"],
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, tokens):
+        state = cls(tokens)
+        with np.load(path) as checkpoint:
+            if int(checkpoint["first_day"]) < 0:
+                return state
+            n_days = checkpoint["key"].shape[1]
+            key = np.full((len(state.tokens), n_days), -1, dtype="int64")
+            total_borrows = np.full((len(state.tokens), n_days), np.nan)
+            # Markets added since the checkpoint start empty
+            rows = pd.Index(state.tokens).get_indexer(checkpoint["tokens"])
+            key[rows[rows >= 0]] = checkpoint["key"][rows >= 0]
+            total_borrows[rows[rows >= 0]] = checkpoint["total_borrows"][rows >= 0]
+            state.grid = DayGrid(
+                len(state.tokens),
+                state.grid.fills,
+                first_day=int(checkpoint["first_day"]),
+                arrays={"key": key, "total_borrows": total_borrows},
+            )
+            state.last_block = int(checkpoint["last_block"])
+        return state
+
+    def daily_borrows(self, symbols, decimals):
+        token_ids, columns = np.nonzero(self.grid["key"] >= 0)
+        daily = pd.DataFrame(
+            {
+                "symbol": np.asarray(symbols)[token_ids],
+                "ds": self.grid.dates(columns),
+                "current_variable_debt": self.grid["total_borrows"][token_ids, columns]
+                / decimals[token_ids],
+            }
+        )
+        return daily.sort_values(by=["symbol", "ds"], ignore_index=True)
+
+
+def reduce_daily_borrows(
+    events_dir, checkpoint_path=None, chunksize=1_000_000, symbols=None
+):
+    # ctokens.csv: cToken address, underlying symbol and underlying decimals
+    ctokens = pd.read_csv(os.path.join(events_dir, "ctokens.csv"))
+    if symbols is not None:
+        ctokens = ctokens.loc[ctokens["symbol"].isin(symbols)].reset_index(drop=True)
+    tokens = ctokens["contract_address"].str.lower()
+    token_index = pd.Index(tokens)
+
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        state = DailyBorrowsState.load(checkpoint_path, tokens)
+    else:
+        state = DailyBorrowsState(tokens)
+
+    start_block = state.last_block
+    for chunk in read_event_chunks(
+        event_files(events_dir, "accrue_interest"), ACCRUE_INTEREST_COLUMNS, chunksize
+    ):
+        # Re-runs only apply blocks after the checkpoint
+        chunk = chunk.loc[chunk["evt_block_number"].to_numpy() > start_block]
+        token_ids = token_index.get_indexer(chunk["contract_address"].str.lower())
+        chunk, token_ids = chunk.loc[token_ids >= 0], token_ids[token_ids >= 0]
+        if not len(chunk):
+            continue
+        state.update(
+            token_ids,
+            event_days(chunk["evt_block_time"]),
+            event_keys(chunk),
+            chunk["totalBorrows"].to_numpy(dtype="float64"),
+        )
+        state.last_block = max(state.last_block, int(chunk["evt_block_number"].max()))
+
+    if checkpoint_path is not None:
+        state.save(checkpoint_path)
+    decimals = 10.0 ** ctokens["decimals"].to_numpy(dtype="float64")
+    return state.daily_borrows(ctokens["symbol"].to_numpy(), decimals)
+
+
+def write_daily_borrows(events_dir, checkpoint_path=DEFAULT_CHECKPOINT, **kwargs):
+    daily = reduce_daily_borrows(events_dir, checkpoint_path, **kwargs)
+    daily["ds"] = daily["ds"].dt.strftime("%Y-%m-%d")
+    write_csv_atomic(daily, "../data/compound_v2.csv", index=False)
+    return daily
+
+
+if __name__ == "__main__":
+    # python compound_reduce.py path/to/compound_v2_events
+    write_daily_borrows(sys.argv[1])
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+
+def log_changes(panel, freq=None):
+    # Optionally sample on a calendar first, e.g. "W-MON" as in the figures
+    if freq is not None:
+        panel = panel.resample(freq).asfreq()
+    return np.log(panel / panel.shift(1))
+
+
+def _window_sums(values, window):
+    # Running sums; a window is the difference of two prefix sums
+    sums = np.cumsum(values, axis=0)
+    if window is None:
+        return sums
+    lagged = np.zeros_like(sums)
+    lagged[window:] = sums[:-window]
+    return sums - lagged
+
+
+def rolling_pairwise_corr(changes, window=None, min_periods=None):
+    # Pairwise-complete Pearson correlation for every column pair, over a
+    # rolling window of rows (or expanding when window is None)
+    columns = list(changes.columns)
+    left, right = np.triu_indices(len(columns), k=1)
+    values = changes.to_numpy(dtype="float64")
+    valid = ~np.isnan(values)
+    # Demeaning keeps the running sums well conditioned
+    values = np.where(valid, values - np.nanmean(values, axis=0), 0.0)
+
+    both = (valid[:, left] & valid[:, right]).astype("float64")
+    x = values[:, left] * both
+    y = values[:, right] * both
+    n = _window_sums(both, window)
+    sum_x = _window_sums(x, window)
+    sum_y = _window_sums(y, window)
+    sum_xx = _window_sums(x * x, window)
+    sum_yy = _window_sums(y * y, window)
+    sum_xy = _window_sums(x * y, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sum_xy - sum_x * sum_y
+        var_x = n * sum_xx - sum_x**2
+        var_y = n * sum_yy - sum_y**2
+        corr = cov / np.sqrt(var_x * var_y)
+    if min_periods is None:
+        min_periods = 2 if window is None else window
+    corr[(n < max(min_periods, 2)) | (var_x <= 0) | (var_y <= 0)] = np.nan
+
+    pairs = pd.MultiIndex.from_arrays(
+        [[columns[i] for i in left], [columns[j] for j in right]],
+        names=["left", "right"],
+    )
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=changes.index, columns=pairs)
+
+
+def pairwise_corr(changes):
+    # Full-sample correlation for every pair, same as DataFrame.corr()
+    return rolling_pairwise_corr(changes).iloc[-1]
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from panel import StablecoinPanel
+from timeseries import TimeSeries
+from tracing import span
+
+# Loaded inputs published once as .npy files plus a JSON schema, laid out
+# like the column store, for worker processes to memory-map read-only.
+# Workers share the pages (RAM-backed under /dev/shm) instead of each
+# unpickling its own copy, so memory does not grow with the worker count
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def _array(values):
+    # Object columns are stored as strings, like the column store; other
+    # objects cannot be memory-mapped
+    if values.dtype != object:
+        return values
+    if pd.api.types.infer_dtype(values, skipna=False) != "string":
+        return None
+    return values.astype(str)
+
+
+def _encode(value):
+    # (kind, {array name: array}, metadata), or None for values workers
+    # rebuild themselves (e.g. FieldIndex, MultiIndex frames)
+    if isinstance(value, TimeSeries):
+        arrays = {"dates": value.dates}
+        arrays.update({f"c{i}": v for i, v in enumerate(value.columns.values())})
+        return "series", arrays, {"columns": list(value.columns)}
+    if isinstance(value, StablecoinPanel):
+        arrays = {
+            "dates": value.dates,
+            "market_cap": value.market_cap,
+            "volume": value.volume,
+        }
+        return "panel", arrays, {"symbols": value.symbols}
+    if not isinstance(value, pd.DataFrame) or isinstance(value.index, pd.MultiIndex):
+        return None
+    # A RangeIndex, as on the lending-pool frame, is kept as its bounds
+    ranged = isinstance(value.index, pd.RangeIndex)
+    arrays = {} if ranged else {"index": _array(value.index.to_numpy())}
+    for i in range(value.shape[1]):
+        arrays[f"c{i}"] = _array(value.iloc[:, i].to_numpy())
+    if any(a is None for a in arrays.values()):
+        return None
+    metadata = {
+        "columns": list(value.columns),
+        "index_name": value.index.name,
+        "index_freq": getattr(value.index, "freqstr", None),
+        "index_range": (
+            [value.index.start, value.index.stop, value.index.step] if ranged else None
+        ),
+    }
+    try:
+        json.dumps(metadata)
+    except TypeError:
+        return None
+    return "frame", arrays, metadata
+
+
+def _decode(entry, arrays):
+    if entry["kind"] == "series":
+        columns = [arrays[f"c{i}"] for i in range(len(entry["columns"]))]
+        return TimeSeries(arrays["dates"], dict(zip(entry["columns"], columns)))
+    if entry["kind"] == "panel":
+        return StablecoinPanel(
+            arrays["dates"], entry["symbols"], arrays["market_cap"], arrays["volume"]
+        )
+    # Numeric columns stay views of the mapped files; strings become objects
+    # again, as they were when published, and are read-only like the rest
+    columns = {}
+    for i, name in enumerate(entry["columns"]):
+        values = arrays[f"c{i}"]
+        if values.dtype.kind == "U":
+            values = values.astype(object)
+            values.flags.writeable = False
+        columns[name] = values
+    index = arrays.get("index")
+    if entry["index_range"] is not None:
+        index = pd.RangeIndex(*entry["index_range"], name=entry["index_name"])
+    elif index.dtype.kind == "U":
+        index = pd.Index(index.astype(object), name=entry["index_name"])
+    elif entry["index_freq"] is not None:
+        index = pd.DatetimeIndex(
+            index, freq=entry["index_freq"], name=entry["index_name"]
+        )
+    else:
+        index = pd.Index(index, name=entry["index_name"])
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def publish(tagged, directory=None):
+    # Write (tag, value) pairs, with JSON-serializable tags, and return the
+    # directory workers attach to. Values that cannot be mapped are skipped
+    directory = directory or tempfile.mkdtemp(prefix="dataplane_", dir=SHARED_DIR)
+    entries = []
+    with span("publish", path=directory) as s:
+        for n, (tag, value) in enumerate(tagged):
+            encoded = _encode(value)
+            if encoded is None:
+                continue
+            kind, arrays, metadata = encoded
+            files = {}
+            for name, values in arrays.items():
+                files[name] = f"{n}_{name}.npy"
+                np.save(os.path.join(directory, files[name]), values)
+            entries.append({"tag": tag, "kind": kind, "files": files, **metadata})
+        with open(os.path.join(directory, "_schema.json"), "w") as f:
+            json.dump({"entries": entries}, f, indent=1)
+        s.set(entries=len(entries), skipped=len(tagged) - len(entries))
+    return directory
+
+
+def attach(directory):
+    # (tag, value) pairs whose arrays are read-only memory maps of the files
+    with open(os.path.join(directory, "_schema.json")) as f:
+        schema = json.load(f)
+    tagged = []
+    for entry in schema["entries"]:
+        arrays = {
+            name: np.load(os.path.join(directory, file_name), mmap_mode="r")
+            for name, file_name in entry["files"].items()
+        }
+        tagged.append((entry["tag"], _decode(entry, arrays)))
+    return tagged
+
+
+def remove(directory):
+    # Mappings already attached stay valid after the files are unlinked
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,100 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+# Room for evt_index inside the composite (block, evt_index) ordering key
+EVENT_INDEX_SPAN = 1_000_000
+
+
+def read_event_chunks(paths, columns, chunksize):
+    # CSV, JSON lines and Parquet dumps, streamed file by file in bounded chunks.
+    # uint256 amounts in JSON lines must be strings, as Dune exports them
+    for path in paths:
+        if path.endswith(".csv"):
+            chunks = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+        elif path.endswith(".jsonl") or path.endswith(".json"):
+            chunks = pd.read_json(path, lines=True, dtype=False, chunksize=chunksize)
+        elif path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            chunks = (
+                batch.to_pandas()
+                for batch in pq.ParquetFile(path).iter_batches(
+                    batch_size=chunksize, columns=columns
+                )
+            )
+        else:
+            raise ValueError(f"Unsupported event file: {path}")
+        for chunk in chunks:
+            yield chunk[columns]
+
+
+def event_files(events_dir, table):
+    return sorted(
+        path
+        for extension in ["csv", "jsonl", "parquet"]
+        for path in glob.glob(os.path.join(events_dir, f"{table}*.{extension}"))
+    )
+
+
+def event_days(block_time):
+    return (
+        pd.to_datetime(block_time, utc=True)
+        .dt.tz_convert(None)
+        .to_numpy()
+        .astype("datetime64[D]")
+        .astype("int64")
+    )
+
+
+def event_keys(chunk):
+    blocks = chunk["evt_block_number"].to_numpy(dtype="int64")
+    return blocks * EVENT_INDEX_SPAN + chunk["evt_index"].to_numpy(dtype="int64")
+
+
+class DayGrid:
+    # Row x day arrays that grow to cover every day seen in the stream
+    def __init__(self, n_rows, fills, first_day=None, arrays=None):
+        self.fills = fills
+        self.first_day = first_day
+        if arrays is None:
+            arrays = {
+                name: np.full((n_rows, 0), fill, dtype=dtype)
+                for name, (dtype, fill) in fills.items()
+            }
+        self.arrays = arrays
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    @property
+    def n_days(self):
+        return next(iter(self.arrays.values())).shape[1]
+
+    def ensure_days(self, days):
+        lo, hi = int(days.min()), int(days.max())
+        if self.first_day is None:
+            self.first_day = lo
+        pad_before = max(0, self.first_day - lo)
+        pad_after = max(0, hi - (self.first_day + self.n_days - 1))
+        if pad_before or pad_after:
+            # Grow by at least a year to keep reallocations rare
+            if pad_after:
+                pad_after = max(pad_after, 366)
+            for name, (dtype, fill) in self.fills.items():
+                self.arrays[name] = np.pad(
+                    self.arrays[name],
+                    ((0, 0), (pad_before, pad_after)),
+                    constant_values=fill,
+                )
+            self.first_day -= pad_before
+        return days - self.first_day
+
+    def dates(self, columns):
+        return (
+            (np.asarray(columns) + self.first_day)
+            .astype("datetime64[D]")
+            .astype("datetime64[ns]")
+        )
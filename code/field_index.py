@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from alignment import align_to, as_of
+
+
+class FieldIndex:
+    # The long Fields/Value/As_of table grouped once by field. Each field keeps
+    # its dates and values sorted by date, so a lookup is a dict access and a
+    # binary search rather than a scan of the whole table
+    def __init__(self, frame):
+        fields = frame["Fields"].to_numpy()
+        dates = frame["As_of"].to_numpy(dtype="datetime64[ns]")
+        values = frame["Value"].to_numpy(dtype="float64")
+        # Stable, so reports with the same date keep their file order
+        order = np.lexsort((dates, fields))
+        fields, dates, values = fields[order], dates[order], values[order]
+        dates.flags.writeable = False
+        values.flags.writeable = False
+        starts = np.flatnonzero(np.r_[True, fields[1:] != fields[:-1]])
+        ends = np.r_[starts[1:], len(fields)]
+        self.fields = {
+            fields[lo]: (dates[lo:hi], values[lo:hi])
+            for lo, hi in zip(starts, ends)
+            if len(fields)
+        }
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def __len__(self):
+        return len(self.fields)
+
+    def copy(self):
+        return self
+
+    def series(self, field):
+        dates, values = self.fields[field]
+        return pd.Series(
+            values.copy(), index=pd.DatetimeIndex(dates, name="As_of"), name=field
+        )
+
+    def latest(self, field):
+        # Most recent reported value, e.g. for single-figure fields
+        dates, values = self.fields[field]
+        valid = values[~np.isnan(values)]
+        return valid[-1] if len(valid) else np.nan
+
+    def as_of(self, field, date):
+        # Last value reported on or before the date, NaN if there is none
+        dates, values = self.fields[field]
+        valid = ~np.isnan(values)
+        target = np.array([pd.Timestamp(date).to_datetime64()], dtype="datetime64[ns]")
+        position = as_of(dates[valid], target, "ffill")[0]
+        return values[valid][position] if position >= 0 else np.nan
+
+    def reindex(self, field, calendar, fill="ffill", tolerance=None):
+        # Values on a calendar under an alignment fill policy
+        return align_to(calendar, [self.series(field)], fill, tolerance)[field]
@@ -1,61 +1,54 @@
 # -------- Prepare the data --------
 import pandas as pd
-import pandas_datareader.data as web
-import requests
 import datetime
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import figure
 
-from api_key import CMC_API_KEY
-from utils import fetch_cmc_data
+from alignment import align_to
+from bootstrap import confidence_interval, error_bars
+from correlation import log_changes, rolling_pairwise_corr
+from render import bar_axes, save_figure
+from utils import (
+    fetch_cmc_data,
+    fetch_cmc_series,
+    fetch_fred_data,
+    fetch_trading_stablecoins,
+)
 
+OUTPUT_PATH = "../output/Figure_corr_comp.pdf"
 
-def plot_circulation_corr(start_date, end_date):
-    read_start_date = start_date - datetime.timedelta(days=5)
 
-    m2_data = (
-        web.DataReader("WM2NS", "fred", read_start_date, end_date)
-        .fillna(method="ffill")
-        .loc[start_date:end_date]
-    )
-    spx_data = (
-        web.DataReader("SP500", "fred", read_start_date, end_date)
-        .fillna(method="ffill")
-        .loc[start_date:end_date]
-    )
+def plot_circulation_corr(start_date, end_date, path=OUTPUT_PATH, ci=None):
+    # ci: confidence level, e.g. 0.95, for block bootstrap error bars
+    read_start_date = start_date - datetime.timedelta(days=5)
 
-    # # Merge M2 and SPX datasets
+    m2_data = fetch_fred_data("WM2NS", read_start_date, end_date)
+    spx_data = fetch_fred_data("SP500", read_start_date, end_date)
 
     # Fetch daily Bitcoin price data from FRED
-    btc_data = web.DataReader("CBBTCUSD", "fred", start_date, end_date)
-    btc_data.fillna(method="ffill", inplace=True)
+    btc_data = fetch_fred_data("CBBTCUSD", start_date, end_date)
 
     # Fetch daily USDC, USDT, and BUSD market cap data from CMC
-    usdc_data = fetch_cmc_data("USDC").loc[start_date:end_date]
-    usdt_data = fetch_cmc_data("USDT").loc[start_date:end_date]
-    busd_data = fetch_cmc_data("BUSD").loc[start_date:end_date]
+    usdc_data = fetch_cmc_series("USDC")
 
     # Combine USDT & BUSD as traidng stablecoins (ts)
-    ts_data = usdt_data.merge(busd_data, left_index=True, right_index=True, how="outer")
-    ts_data.fillna(0, inplace=True)
-    ts_data["ts_market_cap"] = ts_data["USDT_market_cap"] + ts_data["BUSD_market_cap"]
+    ts_data = fetch_trading_stablecoins()
 
     # -------- Calculate the correlation between M2 and SPX --------
-    # Left join for resample purpose
-    spx_m2 = m2_data.merge(spx_data, left_index=True, right_index=True, how="left")
-    spx_m2.sort_index(inplace=True)
+    # SPX on the M2 weeks, carried forward over market holidays
+    spx_m2 = align_to(
+        m2_data.loc[start_date:end_date].index, [m2_data, spx_data], fill="ffill"
+    )
     spx_m2["m2_logchange"] = np.log(spx_m2["WM2NS"] / (spx_m2["WM2NS"].shift(1)))
     spx_m2["sp_logchange"] = np.log(spx_m2["SP500"] / (spx_m2["SP500"].shift(1)))
 
     corr_m2_spx = spx_m2[["m2_logchange", "sp_logchange"]].corr().iloc[0, 1]
 
     # -------- Calculate the correlation between USDC and BTC --------
-    usdc_btc = usdc_data.merge(btc_data, left_index=True, right_index=True, how="inner")
-    # Resample to weekly
-    usdc_btc_weekly = usdc_btc.resample("W-MON").asfreq().loc[start_date:end_date]
-    usdc_btc_weekly.dropna(how="any", axis=0, inplace=True)
-    usdc_btc_weekly.sort_index(inplace=True)
+    # Weekly on Mondays, BTC carried forward over missing days
+    weeks = pd.date_range(start_date, end_date, freq="W-MON")
+    usdc_btc_weekly = align_to(
+        weeks, [usdc_data, btc_data], fill={"CBBTCUSD": "ffill"}
+    ).dropna()
     usdc_btc_weekly["usdc_mktcap_logchange"] = np.log(
         usdc_btc_weekly["USDC_market_cap"]
         / (usdc_btc_weekly["USDC_market_cap"].shift(1))
@@ -69,10 +62,7 @@ def plot_circulation_corr(start_date, end_date):
     )
 
     # -------- Calculate the correlation between Trading stablecoins and BTC --------
-    ts_btc = ts_data.merge(btc_data, left_index=True, right_index=True, how="inner")
-    # Resample to weekly
-    ts_btc_weekly = ts_btc.resample("W-MON").asfreq().loc[start_date:end_date]
-    ts_btc_weekly.sort_index(inplace=True)
+    ts_btc_weekly = align_to(weeks, [ts_data, btc_data], fill={"CBBTCUSD": "ffill"})
     ts_btc_weekly["ts_mktcap_logchange"] = np.log(
         ts_btc_weekly["ts_market_cap"] / (ts_btc_weekly["ts_market_cap"].shift(1))
     )
@@ -85,19 +75,28 @@ def plot_circulation_corr(start_date, end_date):
         ts_btc_weekly[["ts_mktcap_logchange", "btc_logchange"]].corr().iloc[0, 1]
     )
 
-    # plot bar graph
-    figure(figsize=(4, 3))
+    heights = [corr_usdc_btc, corr_m2_spx, corr_ts_btc]
+    yerr = None
+    if ci is not None:
+        # Weekly changes are resampled in blocks, keeping each pair together
+        samples = [
+            usdc_btc_weekly[["usdc_mktcap_logchange", "btc_logchange"]],
+            spx_m2[["m2_logchange", "sp_logchange"]],
+            ts_btc_weekly[["ts_mktcap_logchange", "btc_logchange"]],
+        ]
+        intervals = [confidence_interval(s, "corr", ci) for s in samples]
+        yerr = error_bars(heights, intervals)
 
-    ax = plt.axes()
-    ax.set_axisbelow(True)
-    ax.xaxis.grid(False)
-    ax.yaxis.grid(False)
-    plt.axhline(y=0, color="gray", linestyle="-")
+    # plot bar graph
+    fig, ax = bar_axes()
+    ax.axhline(y=0, color="gray", linestyle="-")
 
-    bars = plt.bar(
+    bars = ax.bar(
         ["USDC & BTC", "M2 & SPX", "Trading Stablecoins & BTC"],
-        [corr_usdc_btc, corr_m2_spx, corr_ts_btc],
+        heights,
         width=0.75,
+        yerr=yerr,
+        capsize=3,
     )
     bars[0].set_color("#2775ca")
     bars[1].set_color("#c7c5d1")
@@ -107,15 +106,37 @@ def plot_circulation_corr(start_date, end_date):
         font="Proxima Nova",
     )
 
-    ax.spines["top"].set_visible(False)
-    ax.spines["right"].set_visible(False)
-
     ax.set_yticks([0, 0.05, 0.1, 0.15, 0.2])
     ax.set_yticklabels([0, 0.05, 0.1, 0.15, 0.2], fontsize=8, font="Proxima Nova")
 
-    plt.xticks(rotation=10, fontsize=8)
+    ax.tick_params(axis="x", labelrotation=10, labelsize=8)
+
+    save_figure(fig, path, bbox_inches="tight")
 
-    plt.savefig("../output/Figure_corr_comp.pdf", bbox_inches="tight")
+
+def rolling_circulation_corr(
+    start_date,
+    end_date,
+    window=26,
+    freq="W-MON",
+    symbols=("USDC", "USDT", "BUSD"),
+    fred_series=("WM2NS", "SP500", "CBBTCUSD"),
+):
+    # Market caps and macro series on one daily calendar, weekly series carried forward
+    read_start_date = start_date - datetime.timedelta(days=5)
+    panel = align_to(
+        pd.date_range(start_date, end_date),
+        [
+            fetch_cmc_data(symbol)[f"{symbol}_market_cap"].rename(symbol)
+            for symbol in symbols
+        ]
+        + [
+            fetch_fred_data(series, read_start_date, end_date)[series]
+            for series in fred_series
+        ],
+        fill="ffill",
+    )
+    return rolling_pairwise_corr(log_changes(panel, freq), window)
 
 
 if __name__ == "__main__":
@@ -1,53 +1,40 @@
-import requests
 import pandas as pd
 import datetime
-import pandas_datareader.data as web
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.pyplot import figure
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
 
-# Create a api_key.py file in the same directory and add your CMC API key
-from api_key import CMC_API_KEY
-from utils import fetch_cmc_data
+from alignment import align_to
+from render import save_figure
+from figures import STABLECOIN_GROUPS
+from panel import members
+from utils import fetch_fred_data, read_stablecoin_panel
+
+OUTPUT_PATH = "../output/Figure_specratio_ts.pdf"
 
 
 def plot_ts_speculative_ratio(
-    start_date=datetime.datetime(2019, 1, 1), end_date=datetime.datetime(2023, 3, 31)
+    start_date=datetime.datetime(2019, 1, 1),
+    end_date=datetime.datetime(2023, 3, 31),
+    path=OUTPUT_PATH,
 ):
-    # Fetch daily USDC, USDT, and BUSD market cap data from CMC
-    usdc_data = fetch_cmc_data("USDC").loc[start_date:end_date]
-    usdt_data = fetch_cmc_data("USDT").loc[start_date:end_date]
-    busd_data = fetch_cmc_data("BUSD").loc[start_date:end_date]
-
-    ts_data = usdt_data.merge(busd_data, left_index=True, right_index=True, how="outer")
-    ts_data.fillna(0, inplace=True)
-    ts_data["ts_market_cap"] = ts_data["USDT_market_cap"] + ts_data["BUSD_market_cap"]
-    ts_data["ts_volume"] = ts_data["USDT_volume"] + ts_data["BUSD_volume"]
-
-    ts_data = ts_data.merge(usdc_data, left_index=True, right_index=True, how="outer")
+    # Daily USDC, USDT and BUSD volume and market cap from CMC, by group
+    panel = (
+        read_stablecoin_panel(members(STABLECOIN_GROUPS))
+        .slice(start_date, end_date)
+        .group(STABLECOIN_GROUPS)
+    )
 
     # Fetch daily Bitcoin price data from FRED
-    btc_data = web.DataReader("CBBTCUSD", "fred", start_date, end_date)
-    btc_data.fillna(method="ffill", inplace=True)
+    btc_data = fetch_fred_data("CBBTCUSD", start_date, end_date)
+    btc_data = btc_data.fillna(method="ffill")
     btc_price_monthly = btc_data["CBBTCUSD"].resample("M").mean()
-    btc_price_monthly.sort_index(inplace=True)
-    btc_price_monthly = btc_price_monthly.reset_index()
-    btc_price_monthly["year"] = btc_price_monthly["DATE"].dt.year
-    dtplot = (
-        ts_data.resample("Y")
-        .mean()
-        .assign(
-            Trading_Stablecoins=lambda x: x.ts_volume / x.ts_market_cap,
-            USDC=lambda x: x.USDC_volume / x.USDC_market_cap,
-        )
-    )
-    # dtplot.index = dtplot.index.year
-    combined = dtplot[["USDC", "Trading_Stablecoins"]].rename(
-        columns={"Trading_Stablecoins": "Trading\nStablecoins"}
+    combined = panel.rollup("Y").rename(
+        columns={"payment": "USDC", "trading": "Trading\nStablecoins"}
     )
-    combined["year"] = combined.index.year
-    combined_btc = btc_price_monthly.merge(combined, on="year", how="left")
+    # Monthly BTC with the ratios of the same year
+    combined_btc = align_to(btc_price_monthly.index, [combined], freq="Y")
+    combined_btc["CBBTCUSD"] = btc_price_monthly
+    combined_btc = combined_btc.reset_index()
 
     df_yearly = combined_btc.loc[
         (combined_btc["DATE"].dt.month == 1) & (combined_btc["DATE"].dt.day == 31)
@@ -63,7 +50,8 @@ def plot_ts_speculative_ratio(
     )
 
     # Start
-    fig, ax1 = plt.subplots(figsize=(4, 3))  #    figure(figsize=(4, 3))
+    fig = Figure(figsize=(4, 3))
+    ax1 = fig.add_subplot()
     ax2 = ax1.twinx()
     ax2.plot(
         combined_btc["DATE"],
@@ -106,7 +94,7 @@ def plot_ts_speculative_ratio(
     # Add a legend
     lines1, labels1 = ax1.get_legend_handles_labels()
     lines2, labels2 = ax2.get_legend_handles_labels()
-    plt.xticks(rotation=0, fontsize=10)
+    ax2.tick_params(axis="x", labelrotation=0, labelsize=10)
     ax1.legend(
         lines1 + lines2,
         labels1 + labels2,
@@ -118,7 +106,7 @@ def plot_ts_speculative_ratio(
 
     # plt.legend(loc="best", fontsize=10, frameon=False)
 
-    plt.savefig("../output/Figure_specratio_ts.pdf", bbox_inches="tight")
+    save_figure(fig, path, bbox_inches="tight")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+import datetime
+
+# OFR series behind the repo inputs
+REPO_MNEMONICS = "REPO-TRI_TV_TOT-P,REPO-DVP_TV_TOT-P,REPO-GCF_TV_TOT-P"
+# Lending markets summed into debt outstanding
+LENDING_PROTOCOLS = ["aave_v2", "aave_v3", "compound_v2"]
+# The USDC debt across them, read as one combined input
+LENDING_POOLS = ("lending_pools", "USDC")
+# Stablecoins compared in the speculative ratio figures, by use
+STABLECOIN_GROUPS = {"payment": ["USDC"], "trading": ["USDT", "BUSD"]}
+
+
+# Each figure declares the plotting function, its arguments and every input it reads
+FIGURES = {
+    "corr_comp": {
+        "module": "figure_corr_comp",
+        "function": "plot_circulation_corr",
+        "kwargs": {
+            "start_date": datetime.datetime(2021, 1, 1),
+            "end_date": datetime.datetime(2023, 3, 31),
+        },
+        "inputs": [
+            (
+                "cmc",
+                "USDC",
+                datetime.datetime(2021, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "cmc",
+                "USDT",
+                datetime.datetime(2021, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "cmc",
+                "BUSD",
+                datetime.datetime(2021, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "fred",
+                "WM2NS",
+                datetime.datetime(2020, 12, 27),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "fred",
+                "SP500",
+                datetime.datetime(2020, 12, 27),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "fred",
+                "CBBTCUSD",
+                datetime.datetime(2021, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+        ],
+    },
+    "financialization": {
+        "module": "figure_financialization",
+        "function": "plot_wallet_to_wallet",
+        "kwargs": {},
+        "inputs": [
+            (
+                "fred",
+                "GDP",
+                datetime.datetime(2018, 12, 25),
+                datetime.datetime(2023, 1, 1),
+            ),
+            ("other_data_source", "usdc_wallet2wallet_transfer"),
+            ("other_data_source", "global_goods_trade"),
+            ("other_data_source", "global_services_trade"),
+            ("other_data_source", "fx_volume"),
+            ("other_data_source", "fedwire_volume"),
+        ],
+    },
+    "leverage": {
+        "module": "figure_leverage",
+        "function": "plot_debt_to_circulation",
+        "kwargs": {
+            "start_date": datetime.datetime(2022, 4, 1),
+            "end_date": datetime.datetime(2023, 3, 31),
+        },
+        "inputs": [
+            (
+                "cmc",
+                "USDC",
+                datetime.datetime(2022, 4, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "fred",
+                "WM2NS",
+                datetime.datetime(2022, 3, 27),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "ofr",
+                REPO_MNEMONICS,
+                datetime.datetime(2022, 4, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            LENDING_POOLS
+            + (datetime.datetime(2022, 4, 1), datetime.datetime(2023, 3, 31)),
+        ],
+    },
+    "leverage_ts": {
+        "module": "figure_leverage_ts",
+        "function": "plot_ts_debt_to_circulation",
+        "kwargs": {
+            "start_date": datetime.datetime(2020, 6, 15),
+            "end_date": datetime.datetime(2023, 3, 31),
+        },
+        "inputs": [
+            (
+                "cmc",
+                "USDC",
+                datetime.datetime(2020, 6, 15),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "fred",
+                "WM2NS",
+                datetime.datetime(2020, 6, 10),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "ofr",
+                REPO_MNEMONICS,
+                datetime.datetime(2020, 6, 15),
+                datetime.datetime(2023, 3, 31),
+            ),
+            LENDING_POOLS
+            + (datetime.datetime(2020, 6, 15), datetime.datetime(2023, 3, 31)),
+        ],
+    },
+    "specratio_comp": {
+        "module": "figure_specratio_comp",
+        "function": "plot_speculative_ratio",
+        "kwargs": {
+            "start_date": datetime.datetime(2021, 1, 1),
+            "end_date": datetime.datetime(2023, 3, 31),
+        },
+        "inputs": [
+            (
+                "cmc",
+                "USDC",
+                datetime.datetime(2021, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "cmc",
+                "USDT",
+                datetime.datetime(2021, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "cmc",
+                "BUSD",
+                datetime.datetime(2021, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "fred",
+                "WM2NS",
+                datetime.datetime(2020, 12, 27),
+                datetime.datetime(2023, 3, 31),
+            ),
+            ("other_data_source", "schwab_dats"),
+            ("other_data_source", "avg_retail_trade_size"),
+            ("other_data_source", "schwab_bda"),
+            ("other_data_source", "usd_denominated_fx_spot_and_forward_volume"),
+            ("other_data_source", "us_equity_volume"),
+            ("other_data_source", "us_fixed_income_volume"),
+        ],
+    },
+    "specratio_ts": {
+        "module": "figure_specratio_ts",
+        "function": "plot_ts_speculative_ratio",
+        "kwargs": {
+            "start_date": datetime.datetime(2019, 1, 1),
+            "end_date": datetime.datetime(2023, 3, 31),
+        },
+        "inputs": [
+            (
+                "cmc",
+                "USDC",
+                datetime.datetime(2019, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "cmc",
+                "USDT",
+                datetime.datetime(2019, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "cmc",
+                "BUSD",
+                datetime.datetime(2019, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+            (
+                "fred",
+                "CBBTCUSD",
+                datetime.datetime(2019, 1, 1),
+                datetime.datetime(2023, 3, 31),
+            ),
+        ],
+    },
+    "transparency": {
+        "module": "figure_transparency",
+        "function": "plot_sanction_compliant",
+        "kwargs": {},
+        "inputs": [
+            ("other_data_source", "usdc_ofac_compliant"),
+            ("other_data_source", "usd_m2_march_2023"),
+            ("other_data_source", "usd_currcir_march_2023"),
+        ],
+    },
+}
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from window_index import WindowIndex
+
+
+def members(groups):
+    # Every symbol of the groups, in order of first appearance
+    return list(dict.fromkeys(s for symbols in groups.values() for s in symbols))
+
+
+class StablecoinPanel:
+    # Market caps and volumes of many stablecoins as two date x symbol
+    # matrices on one calendar, NaN where a coin did not report. Built by one
+    # scatter per symbol instead of a merge per symbol; read-only like
+    # TimeSeries, so copies can be shared
+    def __init__(self, dates, symbols, market_cap, volume):
+        self.dates = np.asarray(dates, dtype="datetime64[ns]")
+        self.symbols = list(symbols)
+        self.market_cap = np.asarray(market_cap, dtype="float64")
+        self.volume = np.asarray(volume, dtype="float64")
+        for values in [self.dates, self.market_cap, self.volume]:
+            values.flags.writeable = False
+
+    @classmethod
+    def from_series(cls, symbols, series):
+        # CMC TimeSeries with <symbol>_market_cap and <symbol>_volume columns
+        dates = np.unique(np.concatenate([s.dates for s in series]))
+        market_cap = np.full((len(dates), len(symbols)), np.nan)
+        volume = np.full((len(dates), len(symbols)), np.nan)
+        for j, (symbol, s) in enumerate(zip(symbols, series)):
+            rows = np.searchsorted(dates, s.dates)
+            market_cap[rows, j] = s[f"{symbol}_market_cap"]
+            volume[rows, j] = s[f"{symbol}_volume"]
+        return cls(dates, symbols, market_cap, volume)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def copy(self):
+        return self
+
+    def slice(self, start_date=None, end_date=None):
+        # Inclusive on both ends like TimeSeries.slice; returns views
+        lo, hi = 0, len(self.dates)
+        if start_date is not None:
+            lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date)))
+        if end_date is not None:
+            end = np.datetime64(pd.Timestamp(end_date))
+            hi = np.searchsorted(self.dates, end, "right")
+        return StablecoinPanel(
+            self.dates[lo:hi],
+            self.symbols,
+            self.market_cap[lo:hi],
+            self.volume[lo:hi],
+        )
+
+    def group(self, groups):
+        # One column per named group, e.g. {"trading": ["USDT", "BUSD"]}, summed
+        # over the members that reported and NaN on days none did
+        membership = np.zeros((len(self.symbols), len(groups)))
+        for j, members in enumerate(groups.values()):
+            membership[[self.symbols.index(s) for s in members], j] = 1.0
+
+        def total(values):
+            valid = ~np.isnan(values)
+            sums = np.where(valid, values, 0.0) @ membership
+            counts = valid.astype("float64") @ membership
+            return np.where(counts > 0, sums, np.nan)
+
+        return StablecoinPanel(
+            self.dates, groups, total(self.market_cap), total(self.volume)
+        )
+
+    def ratios(self):
+        # Daily volume / market cap, date x symbol
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = self.volume / self.market_cap
+        return pd.DataFrame(
+            ratios, index=pd.DatetimeIndex(self.dates), columns=self.symbols
+        )
+
+    def rollup(self, freq, start_date=None, end_date=None):
+        # Mean volume over mean market cap per calendar bucket ("M" or "Y"),
+        # each mean taken over the days the coin or group reported
+        n = len(self.symbols)
+        index = WindowIndex(
+            pd.DataFrame(
+                np.hstack([self.volume, self.market_cap]),
+                index=pd.DatetimeIndex(self.dates),
+            )
+        )
+        means = index.rollup(freq, start_date, end_date)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = means.to_numpy()[:, :n] / means.to_numpy()[:, n:]
+        return pd.DataFrame(ratios, index=means.index, columns=self.symbols)
@@ -0,0 +1,139 @@
+import datetime
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib import font_manager
+from matplotlib.figure import Figure
+
+import dataplane
+import tracing
+from figures import FIGURES
+from tracing import span
+from utils import install_inputs, shared_inputs
+
+# Figures are built on explicit Figure objects, so rendering never touches
+# pyplot state and figures can be drawn in separate worker processes
+FONT_FAMILIES = ["Proxima Nova"] + matplotlib.rcParams["font.family"]
+# Figures read a few days before their start date, e.g. for weekly M2
+READ_AHEAD = datetime.timedelta(days=7)
+
+
+def bar_axes(figsize=(4, 3)):
+    # Shared bar-chart style: no grid, bars above gridlines, open top and right
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    ax.set_axisbelow(True)
+    ax.xaxis.grid(False)
+    ax.yaxis.grid(False)
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    return fig, ax
+
+
+def save_figure(fig, path, **kwargs):
+    # The span covers font lookup and the PDF write
+    with span("render", path=path) as s:
+        fig.savefig(path, **kwargs)
+        if tracing.enabled():
+            s.set(bytes=os.path.getsize(path))
+
+
+def warm_fonts():
+    # findfont results are cached per process, so the missing Proxima Nova
+    # and its fallback are resolved once rather than on every draw
+    for family in FONT_FAMILIES:
+        font_manager.findfont(font_manager.FontProperties(family=[family]))
+
+
+def _init_worker(plane=None):
+    matplotlib.use("Agg")
+    warm_fonts()
+    # Inputs loaded by the parent, as read-only views of the data plane
+    if plane is not None:
+        install_inputs(dataplane.attach(plane))
+
+
+def variant_path(path, start_date, end_date):
+    root, ext = os.path.splitext(path)
+    return f"{root}_{start_date:%Y%m%d}_{end_date:%Y%m%d}{ext}"
+
+
+def render_tasks(figure_names=None, periods=()):
+    # (name, kwargs, output path): each figure once with its declared
+    # arguments, then once per extra period for figures that take a date range
+    figure_names = list(FIGURES) if figure_names is None else figure_names
+    tasks = []
+    for period in [None] + list(periods):
+        for name in figure_names:
+            spec = FIGURES[name]
+            path = importlib.import_module(spec["module"]).OUTPUT_PATH
+            if period is None:
+                tasks.append((name, spec["kwargs"], path))
+            elif "start_date" in spec["kwargs"]:
+                path = variant_path(path, *period)
+                kwargs = {"start_date": period[0], "end_date": period[1], "path": path}
+                tasks.append((name, kwargs, path))
+    return tasks
+
+
+def _render(name, kwargs):
+    spec = FIGURES[name]
+    start = time.perf_counter()
+    getattr(importlib.import_module(spec["module"]), spec["function"])(**kwargs)
+    return time.perf_counter() - start
+
+
+def render_figures(figure_names=None, periods=(), max_workers=None, force=False):
+    from build_all import (
+        figure_hash,
+        is_current,
+        load_declared_input,
+        load_manifest,
+        resolve_inputs,
+        save_manifest,
+    )
+
+    figure_names = list(FIGURES) if figure_names is None else figure_names
+    periods = list(periods)
+    render_start = time.perf_counter()
+
+    # Load every input in this process first and publish it once to the data
+    # plane, so workers map it rather than reload it or race to fill the caches
+    loads, fields = resolve_inputs(figure_names)
+    for (kind, key), date_range in loads.items():
+        if date_range is not None and periods:
+            date_range = (
+                min([date_range[0]] + [p[0] - READ_AHEAD for p in periods]),
+                max([date_range[1]] + [p[1] for p in periods]),
+            )
+        load_declared_input(kind, key, date_range, fields)
+    print(f"Loaded {len(loads)} inputs in {time.perf_counter() - render_start:.2f}s")
+
+    # Only outputs whose code, arguments or inputs changed since the last build
+    manifest = load_manifest()
+    tasks = []
+    for name, kwargs, path in render_tasks(figure_names, periods):
+        digest = figure_hash(name, kwargs)
+        if force or not is_current(manifest, path, digest):
+            tasks.append((name, kwargs, path, digest))
+
+    plane = dataplane.publish(shared_inputs()) if tasks else None
+    try:
+        with ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(plane,)
+        ) as executor:
+            futures = [
+                executor.submit(_render, name, kwargs) for name, kwargs, *_ in tasks
+            ]
+            for (name, _, path, digest), future in zip(tasks, futures):
+                seconds = future.result()
+                manifest[path] = digest
+                save_manifest(manifest)
+                print(f"Rendered {os.path.basename(path)} in {seconds:.2f}s")
+    finally:
+        if plane is not None:
+            dataplane.remove(plane)
+    print(f"Rendered {len(tasks)} figures in {time.perf_counter() - render_start:.2f}s")
@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from utils import API_URLS, TokenBucket
+
+# Local stand-in for the CMC, OFR and FRED endpoints. Start it, then set
+# API_BASE_URL=http://127.0.0.1:<port> so utils.api_url sends every fetch here
+RECORDINGS_DIR = "../data/recordings"
+# Forwarded upstream when recording; never written to the recordings
+FORWARD_HEADERS = ["X-CMC_PRO_API_KEY", "Accepts", "Accept"]
+
+
+def recording_path(provider, path, query):
+    # Exact replay: one file per path and sorted query string
+    params = sorted(parse_qsl(query, keep_blank_values=True))
+    key = json.dumps([path, params])
+    file_name = hashlib.sha1(key.encode()).hexdigest() + ".json"
+    return os.path.join(RECORDINGS_DIR, provider, file_name)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        record=False,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        rate_per_minute=None,
+        seed=None,
+    ):
+        super().__init__(address, StandInHandler)
+        self.record = record
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # Per-provider limits, like the real APIs
+        self.buckets = {
+            provider: TokenBucket(rate_per_minute)
+            for provider in API_URLS
+            if rate_per_minute
+        }
+        self.random = random.Random(seed)
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    def count(self, provider, status):
+        with self.stats_lock:
+            by_status = self.stats.setdefault(provider, {})
+            by_status[status] = by_status.get(status, 0) + 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="text/plain", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        if url.path == "/_stats":
+            with server.stats_lock:
+                body = json.dumps(server.stats).encode()
+            return self._send(200, body, "application/json")
+
+        provider, _, path = url.path.lstrip("/").partition("/")
+        if provider not in API_URLS:
+            return self._send(404, b"unknown provider")
+        path = "/" + path
+
+        # Rate limit first, as the providers reject before doing any work
+        if provider in server.buckets:
+            wait = server.buckets[provider].try_acquire()
+            if wait:
+                server.count(provider, 429)
+                return self._send(429, headers={"Retry-After": str(int(wait) + 1)})
+        with server.stats_lock:
+            delay = server.latency + server.random.uniform(0, server.jitter)
+            fail = server.random.random() < server.error_rate
+        time.sleep(delay)
+        if fail:
+            server.count(provider, 503)
+            return self._send(503, b"injected error")
+
+        file_path = recording_path(provider, path, url.query)
+        if server.record:
+            recorded = self._record(provider, path, url.query, file_path)
+        else:
+            try:
+                with open(file_path) as f:
+                    recorded = json.load(f)
+            except FileNotFoundError:
+                server.count(provider, 404)
+                return self._send(404, f"no recording for {self.path}".encode())
+        server.count(provider, recorded["status"])
+        self._send(
+            recorded["status"], recorded["body"].encode(), recorded["content_type"]
+        )
+
+    def _record(self, provider, path, query, file_path):
+        upstream = urlsplit(API_URLS[provider])
+        response = requests.get(
+            f"{upstream.scheme}://{upstream.netloc}{path}",
+            params=parse_qsl(query, keep_blank_values=True),
+            headers={
+                name: self.headers[name]
+                for name in FORWARD_HEADERS
+                if name in self.headers
+            },
+        )
+        recorded = {
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", "text/plain"),
+            "body": response.text,
+        }
+        # Only successful responses are kept for replay
+        if response.status_code == 200:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(recorded, f)
+            os.replace(tmp_path, file_path)
+        return recorded
+
+
+def start_server(port=0, **kwargs):
+    # Serves from a background thread; port 0 picks a free port
+    server = StandInServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-per-minute", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server, base_url = start_server(
+        args.port,
+        record=args.record,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_per_minute=args.rate_per_minute,
+        seed=args.seed,
+    )
+    mode = "Recording" if args.record else "Replaying"
+    print(f"{mode} on {base_url}; set API_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(server.stats))
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from tracing import span
+
+DATA_DIR = "../data"
+STORE_DIR = "../data/store"
+# Unnamed first CSV column, used by the CMC price histories
+INDEX_COLUMN = "__index__"
+
+# Rows scanned per block when filtering on column values
+CHUNK_ROWS = 1_000_000
+
+# Date column each table is sorted on; CMC histories use their index
+TABLE_DATE_COLUMNS = {
+    "aave_v2": "ds",
+    "aave_v3": "ds",
+    "compound_v2": "ds",
+    "other_data_source": "As_of",
+}
+
+
+def _table_dir(name):
+    return os.path.join(STORE_DIR, name)
+
+
+def _schema_path(name):
+    return os.path.join(_table_dir(name), "_schema.json")
+
+
+def _csv_path(name):
+    return os.path.join(DATA_DIR, f"{name}.csv")
+
+
+def convert_csv(name):
+    date_column = TABLE_DATE_COLUMNS.get(name, INDEX_COLUMN)
+    with span("read_csv", table=name) as s:
+        df = pd.read_csv(_csv_path(name))
+        s.set(rows=len(df), bytes=os.path.getsize(_csv_path(name)))
+    if date_column == INDEX_COLUMN:
+        df.rename(columns={df.columns[0]: INDEX_COLUMN}, inplace=True)
+    df[date_column] = pd.to_datetime(df[date_column])
+
+    # Sort on date first so range reads are a contiguous slice
+    key_columns = [date_column] + [
+        c for c in ["symbol", "Fields"] if c in df.columns and c != date_column
+    ]
+    df.sort_values(by=key_columns, kind="mergesort", inplace=True)
+
+    tmp_dir = _table_dir(name) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    columns = {}
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            values = df[column].astype(str).to_numpy(dtype=str)
+        file_name = f"{i}.npy"
+        np.save(os.path.join(tmp_dir, file_name), values)
+        columns[column] = {"file": file_name, "dtype": str(values.dtype)}
+    schema = {
+        "columns": columns,
+        "date_column": date_column,
+        "sorted_by": key_columns,
+        "rows": len(df),
+    }
+    with open(os.path.join(tmp_dir, "_schema.json"), "w") as f:
+        json.dump(schema, f, indent=1)
+    shutil.rmtree(_table_dir(name), ignore_errors=True)
+    os.replace(tmp_dir, _table_dir(name))
+    return schema
+
+
+def _is_stale(name):
+    if not os.path.exists(_schema_path(name)):
+        return True
+    if not os.path.exists(_csv_path(name)):
+        return False
+    return os.path.getmtime(_csv_path(name)) > os.path.getmtime(_schema_path(name))
+
+
+def load_schema(name):
+    if _is_stale(name):
+        return convert_csv(name)
+    with open(_schema_path(name)) as f:
+        return json.load(f)
+
+
+def load_table(name, columns=None, start_date=None, end_date=None):
+    with span("load_table", table=name) as s:
+        df = _load_table(name, columns, start_date, end_date)
+        s.set(rows=len(df), bytes=int(df.memory_usage(deep=False).sum()))
+    return df
+
+
+def load_columns(name, columns=None, start_date=None, end_date=None, where=None):
+    # Column name -> array for the date range, with the date column first.
+    # where maps columns to allowed values, e.g. {"symbol": ["USDC"]}
+    schema = load_schema(name)
+    date_column = schema["date_column"]
+
+    def column_array(column):
+        path = os.path.join(_table_dir(name), schema["columns"][column]["file"])
+        return np.load(path, mmap_mode="r")
+
+    # Binary search the sorted date column; only the slice is read from disk
+    dates = column_array(date_column)
+    lo, hi = 0, len(dates)
+    if start_date is not None:
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date)), "left")
+    if end_date is not None:
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date)), "right")
+    hi = max(hi, lo)
+
+    if columns is None:
+        columns = list(schema["columns"])
+    elif date_column == INDEX_COLUMN and INDEX_COLUMN not in columns:
+        columns = [INDEX_COLUMN] + list(columns)
+    if not where:
+        return {column: np.array(column_array(column)[lo:hi]) for column in columns}
+
+    # Filter the range block by block, then read only the matching rows
+    keep = np.zeros(hi - lo, dtype=bool)
+    for start in range(lo, hi, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, hi)
+        mask = np.ones(stop - start, dtype=bool)
+        for column, values in where.items():
+            mask &= np.isin(column_array(column)[start:stop], list(values))
+        keep[start - lo : stop - lo] = mask
+    rows = lo + np.flatnonzero(keep)
+    return {column: np.asarray(column_array(column)[rows]) for column in columns}
+
+
+def _load_table(name, columns, start_date, end_date):
+    df = pd.DataFrame(load_columns(name, columns, start_date, end_date))
+    if INDEX_COLUMN in df.columns:
+        df.set_index(INDEX_COLUMN, inplace=True)
+        df.index.name = None
+    return df
+
+
+if __name__ == "__main__":
+    for file_name in sorted(os.listdir(DATA_DIR)):
+        if file_name.endswith(".csv"):
+            name = file_name[: -len(".csv")]
+            print(name, convert_csv(name)["rows"])
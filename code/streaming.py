@@ -0,0 +1,381 @@
+import datetime
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from alignment import align_to
+from figures import FIGURES, STABLECOIN_GROUPS
+from panel import StablecoinPanel, members
+from tracing import span
+
+# Headline means and correlations kept as running accumulators, so a refresh
+# folds in only the rows appended since the last one instead of recomputing
+# from start_date. Sources are assumed append-only: rows on or before a
+# metric's "through" date are final and never read again
+STATE_PATH = "../data/cache/streaming.json"
+
+
+def _date(value):
+    return None if value is None else pd.Timestamp(value).isoformat()
+
+
+def _timestamp(value):
+    return None if value is None else pd.Timestamp(value)
+
+
+def _rows(frame, after=None):
+    # (dates, {column: float64 values}) of the rows dated after a date, from
+    # a TimeSeries, DataFrame or Series; found by binary search
+    if isinstance(frame, pd.Series):
+        frame = frame.to_frame()
+    if hasattr(frame, "dates"):
+        after = None if after is None else after.to_datetime64()
+        lo = 0 if after is None else np.searchsorted(frame.dates, after, "right")
+        return frame.dates[lo:], {c: v[lo:] for c, v in frame.columns.items()}
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+    if after is not None:
+        frame = frame.iloc[frame.index.searchsorted(after, "right") :]
+    dates = frame.index.to_numpy(dtype="datetime64[ns]")
+    return dates, {c: frame[c].to_numpy(dtype="float64") for c in frame.columns}
+
+
+def _calendar(start_date, freq, first, last):
+    # pd.date_range(start_date, last, freq) from first on, without building
+    # the dates before it. Tick frequencies ("h", "D") count steps from
+    # start_date; anchored ones ("W-MON", "M") roll forward on their own
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Tick) and first > start_date:
+        first = start_date + -(-(first - start_date) // offset.delta) * offset.delta
+    return pd.date_range(first, last, freq=offset).to_numpy()
+
+
+def _pending(dates, start_date, through, new_through):
+    # Dates not folded in yet: from start_date, after the previous through
+    # date and up to the new one
+    pending = (dates >= start_date.to_datetime64()) & (
+        dates <= new_through.to_datetime64()
+    )
+    if through is not None:
+        pending &= dates > through.to_datetime64()
+    return pending
+
+
+class Moments:
+    # Count, mean and sum of squared deviations (Welford). A batch of k
+    # values is merged with the pairwise update of Chan et al., so each
+    # refresh costs O(k) whatever the length of the history
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        k = len(values)
+        if not k:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        n = self.n + k
+        delta = batch_mean - self.mean
+        self.mean += delta * k / n
+        self.m2 += batch_m2 + delta**2 * self.n * k / n
+        self.n = n
+
+    def value(self):
+        return self.mean if self.n else np.nan
+
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def state(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2}
+
+
+class Comoments:
+    # Moments of two columns plus their co-moment, over the rows where both
+    # are present (pairwise complete, as DataFrame.corr)
+    def __init__(self, n=0, mean=(0.0, 0.0), m2=(0.0, 0.0), cxy=0.0):
+        self.n, self.mean, self.m2, self.cxy = n, list(mean), list(m2), cxy
+
+    def update(self, x, y):
+        x, y = np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64")
+        both = np.isfinite(x) & np.isfinite(y)
+        x, y = x[both], y[both]
+        k = len(x)
+        if not k:
+            return
+        batch_mean = [x.mean(), y.mean()]
+        dx, dy = x - batch_mean[0], y - batch_mean[1]
+        n = self.n + k
+        delta = [batch_mean[i] - self.mean[i] for i in range(2)]
+        weight = self.n * k / n
+        self.m2[0] += (dx * dx).sum() + delta[0] ** 2 * weight
+        self.m2[1] += (dy * dy).sum() + delta[1] ** 2 * weight
+        self.cxy += (dx * dy).sum() + delta[0] * delta[1] * weight
+        self.mean = [self.mean[i] + delta[i] * k / n for i in range(2)]
+        self.n = n
+
+    def value(self):
+        if self.n < 2 or self.m2[0] <= 0 or self.m2[1] <= 0:
+            return np.nan
+        return min(1.0, max(-1.0, self.cxy / math.sqrt(self.m2[0] * self.m2[1])))
+
+    def state(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2, "cxy": self.cxy}
+
+
+class Mean:
+    # Running mean of a column from start_date, e.g. a daily speculative ratio
+    def __init__(self, column, start_date):
+        self.column = column
+        self.start_date = pd.Timestamp(start_date)
+        self.moments = Moments()
+        self.through = None
+
+    def params(self):
+        return {"type": "mean", "column": self.column, "start": _date(self.start_date)}
+
+    def update(self, frame, through=None):
+        dates, columns = _rows(frame, self.through)
+        if through is None:
+            if not len(dates):
+                return
+            through = dates[-1]
+        through = pd.Timestamp(through)
+        pending = _pending(dates, self.start_date, self.through, through)
+        self.moments.update(columns[self.column][pending])
+        self.through = through if self.through is None else max(self.through, through)
+
+    def value(self):
+        return self.moments.value()
+
+    def state(self):
+        return {"through": _date(self.through), "moments": self.moments.state()}
+
+    def restore(self, state):
+        self.through = _timestamp(state["through"])
+        self.moments = Moments(**state["moments"])
+
+
+class LogChangeCorr:
+    # Correlation of the log changes of two columns between consecutive
+    # snapshots, as in plot_circulation_corr. Snapshots are taken on a freq
+    # calendar from start_date (e.g. "W-MON"), or on the first column's own
+    # dates when freq is None. fill is an align_to policy, "exact" or "ffill"
+    # only, since later rows are not known yet. With skip_missing, snapshots
+    # missing either column are dropped before taking changes (as with
+    # .dropna() first); otherwise the change into and out of them is missing
+    def __init__(
+        self, columns, start_date, freq=None, fill="exact", skip_missing=False
+    ):
+        self.columns = list(columns)
+        self.start_date = pd.Timestamp(start_date)
+        self.freq = freq
+        self.fill = fill
+        self.skip_missing = skip_missing
+        self.comoments = Comoments()
+        self.through = None
+        # Last snapshot, and each column's last observation for ffill
+        self.snapshot = None
+        self.carry = {}
+
+    def params(self):
+        return {
+            "type": "log_change_corr",
+            "columns": self.columns,
+            "start": _date(self.start_date),
+            "freq": self.freq,
+            "fill": self.fill,
+            "skip_missing": self.skip_missing,
+        }
+
+    def update(self, frames, through=None):
+        # frames hold the columns, as full histories or just the new rows.
+        # Snapshots up to through (default: the earliest last row among the
+        # frames) become final
+        rows = {}
+        for frame in frames:
+            # The first update also reads rows before start_date, which ffill
+            # columns carry into the first snapshot
+            dates, columns = _rows(frame, self.through)
+            for name in self.columns:
+                if name in columns:
+                    rows[name] = (dates, columns[name])
+        if through is None:
+            if not all(len(dates) for dates, _ in rows.values()):
+                return
+            through = min(dates[-1] for dates, _ in rows.values())
+        through = pd.Timestamp(through)
+        if self.through is not None and through <= self.through:
+            return
+
+        if self.freq is None:
+            calendar = rows[self.columns[0]][0]
+        else:
+            first = self.start_date if self.through is None else self.through
+            calendar = _calendar(self.start_date, self.freq, first, through)
+        calendar = calendar[_pending(calendar, self.start_date, self.through, through)]
+        observed = []
+        for name in self.columns:
+            dates, values = rows[name]
+            final = dates <= through.to_datetime64()
+            dates, values = dates[final], values[final]
+            if name in self.carry:
+                date, value = self.carry[name]
+                dates = np.r_[np.datetime64(pd.Timestamp(date), "ns"), dates]
+                values = np.r_[value, values]
+            valid = ~np.isnan(values)
+            if valid.any():
+                self.carry[name] = [_date(dates[valid][-1]), float(values[valid][-1])]
+            observed.append(pd.Series(values, index=pd.DatetimeIndex(dates), name=name))
+        snapshots = align_to(calendar, observed, self.fill)[self.columns].to_numpy()
+
+        if self.skip_missing:
+            snapshots = snapshots[~np.isnan(snapshots).any(axis=1)]
+        if len(snapshots):
+            previous = (
+                np.full((1, 2), np.nan) if self.snapshot is None else [self.snapshot]
+            )
+            levels = np.vstack([previous, snapshots])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                changes = np.log(levels[1:] / levels[:-1])
+            self.comoments.update(changes[:, 0], changes[:, 1])
+            self.snapshot = [float(v) for v in snapshots[-1]]
+        self.through = through
+
+    def value(self):
+        return self.comoments.value()
+
+    def state(self):
+        return {
+            "through": _date(self.through),
+            "comoments": self.comoments.state(),
+            "snapshot": self.snapshot,
+            "carry": self.carry,
+        }
+
+    def restore(self, state):
+        self.through = _timestamp(state["through"])
+        self.comoments = Comoments(**state["comoments"])
+        self.snapshot = state["snapshot"]
+        self.carry = state["carry"]
+
+
+def headline_metrics():
+    # The figure headline numbers, from the figures' own start dates
+    corr_start = FIGURES["corr_comp"]["kwargs"]["start_date"]
+    ratio_start = FIGURES["specratio_comp"]["kwargs"]["start_date"]
+    debt_start = FIGURES["leverage"]["kwargs"]["start_date"]
+    btc_fill = {"CBBTCUSD": "ffill"}
+    return {
+        "usdc_speculative_ratio": Mean("payment", ratio_start),
+        "trading_speculative_ratio": Mean("trading", ratio_start),
+        "usdc_debt_to_mktcap": Mean("usdc_debt_to_mktcap", debt_start),
+        "corr_usdc_btc": LogChangeCorr(
+            ["USDC_market_cap", "CBBTCUSD"], corr_start, "W-MON", btc_fill, True
+        ),
+        "corr_m2_spx": LogChangeCorr(
+            ["WM2NS", "SP500"], corr_start, fill={"SP500": "ffill"}
+        ),
+        "corr_ts_btc": LogChangeCorr(
+            ["ts_market_cap", "CBBTCUSD"], corr_start, "W-MON", btc_fill
+        ),
+    }
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(metrics, path=STATE_PATH):
+    state = {
+        name: {"params": metric.params(), **metric.state()}
+        for name, metric in metrics.items()
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def restore_metrics(metrics, state):
+    # Metrics whose definition changed since the state was saved start over
+    for name, metric in metrics.items():
+        if name in state and state[name]["params"] == metric.params():
+            metric.restore(state[name])
+    return metrics
+
+
+def update_metrics(end_date=None, path=STATE_PATH):
+    # Load the saved accumulators, fold in the new rows and save them again.
+    # Only rows from the earliest saved through date are read: CMC and
+    # lending-pool tables by date pushdown, FRED by the requested range
+    from figure_leverage import debt_to_mktcap
+    from utils import (
+        fetch_fred_data,
+        read_cmc_rows,
+        read_lending_pools,
+        trading_stablecoins,
+    )
+
+    metrics = restore_metrics(headline_metrics(), load_state(path))
+    end_date = pd.Timestamp(end_date or datetime.date.today())
+    read_start_date = min(
+        m.start_date if m.through is None else m.through for m in metrics.values()
+    )
+    with span("streaming", metrics=len(metrics)) as s:
+        symbols = members(STABLECOIN_GROUPS)
+        cmc = {
+            symbol: read_cmc_rows(symbol, read_start_date, end_date)
+            for symbol in symbols
+        }
+
+        # Daily volume / market cap of each group, for the new days only
+        panel = StablecoinPanel.from_series(symbols, [cmc[s] for s in symbols])
+        ratios = panel.group(STABLECOIN_GROUPS).ratios()
+        metrics["usdc_speculative_ratio"].update(ratios)
+        metrics["trading_speculative_ratio"].update(ratios)
+
+        lending_pools = read_lending_pools(
+            start_date=read_start_date, end_date=end_date
+        )
+        # Lending pools refresh separately and can lag CMC, so a day is final
+        # only once both have it; later days are read again next time
+        if len(cmc["USDC"]) and len(lending_pools):
+            debt = debt_to_mktcap(cmc["USDC"], lending_pools)
+            through = min(
+                pd.Timestamp(cmc["USDC"].dates[-1]), lending_pools["ds"].max()
+            )
+            metrics["usdc_debt_to_mktcap"].update(debt, through=through)
+
+        # FRED is read from the earliest date a correlation still needs
+        # (a few days early for the first weekly values)
+        corrs = [metrics[n] for n in ["corr_usdc_btc", "corr_m2_spx", "corr_ts_btc"]]
+        fred_start_date = min(
+            (
+                m.start_date - datetime.timedelta(days=5)
+                if m.through is None
+                else m.through
+            )
+            for m in corrs
+        )
+        fred = {
+            series: fetch_fred_data(series, fred_start_date, end_date)
+            for series in ["WM2NS", "SP500", "CBBTCUSD"]
+        }
+        trading = trading_stablecoins(cmc["USDT"], cmc["BUSD"])
+        metrics["corr_usdc_btc"].update([cmc["USDC"], fred["CBBTCUSD"]])
+        metrics["corr_m2_spx"].update([fred["WM2NS"], fred["SP500"]])
+        metrics["corr_ts_btc"].update([trading, fred["CBBTCUSD"]])
+        s.set(rows=sum(len(series) for series in cmc.values()))
+    save_state(metrics, path)
+    return {name: metric.value() for name, metric in metrics.items()}
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+import benchmark
+import store
+import streaming
+import utils
+from figures import LENDING_PROTOCOLS
+
+END_DATE = pd.Timestamp("2023-03-31")
+
+
+@pytest.fixture
+def fixture_data(tmp_path, monkeypatch):
+    # Synthetic CMC and lending tables, FRED served from memory
+    data_dir = str(tmp_path / "data")
+    benchmark.write_fixtures(data_dir)
+    monkeypatch.setattr(store, "DATA_DIR", data_dir)
+    monkeypatch.setattr(store, "STORE_DIR", os.path.join(data_dir, "store"))
+    utils.reset_inputs()
+    for (provider, series), data in benchmark.fetch_stand_ins().items():
+        utils.preload_fetch(provider, series, data)
+    yield data_dir
+    utils.reset_inputs()
+
+
+def write_lending_pools(data_dir, tables, through=None):
+    # Rows dated up to through, newer than the converted column store
+    for protocol, table in tables.items():
+        if through is not None:
+            table = table[pd.to_datetime(table["ds"]) <= through]
+        path = os.path.join(data_dir, f"{protocol}.csv")
+        table.to_csv(path, index=False)
+        mtime = os.path.getmtime(path) + 10
+        os.utime(path, (mtime, mtime))
+
+
+def test_debt_ratio_waits_for_lagging_lending_pools(fixture_data, tmp_path):
+    tables = {
+        protocol: pd.read_csv(
+            os.path.join(fixture_data, f"{protocol}.csv"),
+            dtype=str,
+            keep_default_na=False,
+        )
+        for protocol in LENDING_PROTOCOLS
+    }
+    batch = streaming.update_metrics(END_DATE, str(tmp_path / "batch.json"))
+
+    # CMC is refreshed to the end date while the lending rows stop ten days
+    # short; they arrive with the next refresh
+    path = str(tmp_path / "lagged.json")
+    write_lending_pools(fixture_data, tables, END_DATE - pd.Timedelta(days=10))
+    streaming.update_metrics(END_DATE, path)
+    write_lending_pools(fixture_data, tables)
+    lagged = streaming.update_metrics(END_DATE, path)
+
+    assert lagged["usdc_debt_to_mktcap"] == pytest.approx(
+        batch["usdc_debt_to_mktcap"], rel=1e-12
+    )
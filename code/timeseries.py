@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from alignment import as_of
+
+
+class TimeSeries:
+    # Daily histories as a sorted datetime64 array plus one contiguous float64
+    # array per column. Instances are read-only, so slices are views and
+    # copies can be shared freely
+    def __init__(self, dates, columns):
+        # Views are frozen, not the caller's arrays, which stay writeable
+        self.dates = np.asarray(dates, dtype="datetime64[ns]").view()
+        self.columns = {
+            name: np.asarray(values, dtype="float64").view()
+            for name, values in columns.items()
+        }
+        self.dates.flags.writeable = False
+        for values in self.columns.values():
+            values.flags.writeable = False
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df.index.to_numpy(), {c: df[c].to_numpy() for c in df.columns})
+
+    def to_frame(self):
+        return pd.DataFrame(
+            {name: values.copy() for name, values in self.columns.items()},
+            index=pd.DatetimeIndex(self.dates.copy()),
+        )
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def copy(self):
+        return self
+
+    @property
+    def nbytes(self):
+        return self.dates.nbytes + sum(v.nbytes for v in self.columns.values())
+
+    def slice(self, start_date=None, end_date=None):
+        # Inclusive on both ends like .loc[start:end]; returns views
+        lo, hi = 0, len(self.dates)
+        if start_date is not None:
+            lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date)))
+        if end_date is not None:
+            end = np.datetime64(pd.Timestamp(end_date))
+            hi = np.searchsorted(self.dates, end, "right")
+        return TimeSeries(
+            self.dates[lo:hi],
+            {name: values[lo:hi] for name, values in self.columns.items()},
+        )
+
+    def reindex(self, dates, fill=np.nan):
+        # Values on another sorted calendar, located by binary search
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        if not len(self):
+            return TimeSeries(
+                dates, {name: np.full(len(dates), fill) for name in self.columns}
+            )
+        positions = as_of(self.dates, dates)
+        found = positions >= 0
+        return TimeSeries(
+            dates,
+            {
+                name: np.where(found, values[positions], fill)
+                for name, values in self.columns.items()
+            },
+        )
+
+    def fillna(self, value):
+        return TimeSeries(
+            self.dates,
+            {
+                name: np.where(np.isnan(values), value, values)
+                for name, values in self.columns.items()
+            },
+        )
+
+    def assign(self, **columns):
+        return TimeSeries(self.dates, {**self.columns, **columns})
+
+    def select(self, names):
+        return TimeSeries(self.dates, {name: self.columns[name] for name in names})
+
+
+def align(series, how="outer", fill=np.nan):
+    # One TimeSeries on the union (or intersection) of the calendars, like
+    # chained DataFrame.merge on the index
+    dates = series[0].dates
+    for other in series[1:]:
+        if how == "outer":
+            dates = np.union1d(dates, other.dates)
+        elif how == "inner":
+            dates = np.intersect1d(dates, other.dates)
+        else:
+            raise ValueError(f"Unknown join: {how}")
+    columns = {}
+    for s in series:
+        columns.update(s.reindex(dates, fill).columns)
+    return TimeSeries(dates, columns)
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Timed spans around fetch, read, transform and render stages. Tracing is off
+# unless enable() is called, and span() then hands back a shared no-op object
+_enabled = False
+_trace_memory = False
+_spans = []
+_lock = threading.Lock()
+_origin = time.perf_counter()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        # Attributes known only after the work, e.g. rows or bytes
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        if _trace_memory:
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if _trace_memory:
+            # Allocations are process wide, so concurrent spans overlap
+            self.attrs["memory_delta"] = (
+                tracemalloc.get_traced_memory()[0] - self.memory
+            )
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        with _lock:
+            _spans.append(
+                {
+                    "name": self.name,
+                    "start": self.start - _origin,
+                    "seconds": end - self.start,
+                    "thread": self.thread,
+                    "attrs": self.attrs,
+                }
+            )
+        return False
+
+
+def span(name, **attrs):
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+
+def enabled():
+    return _enabled
+
+
+def enable(trace_memory=False):
+    global _enabled, _trace_memory
+    _enabled = True
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory:
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+
+
+def spans():
+    with _lock:
+        return list(_spans)
+
+
+def write_chrome_trace(path):
+    # Complete ("X") events in microseconds; open in chrome://tracing or Perfetto
+    events = [
+        {
+            "name": s["name"],
+            "ph": "X",
+            "ts": s["start"] * 1e6,
+            "dur": s["seconds"] * 1e6,
+            "pid": os.getpid(),
+            "tid": s["thread"],
+            "args": s["attrs"],
+        }
+        for s in spans()
+    ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events}, f, default=str)
+
+
+def summary():
+    # Totals per span name, in order of first appearance
+    totals = {}
+    for s in spans():
+        total = totals.setdefault(
+            s["name"], {"count": 0, "seconds": 0.0, "rows": 0, "bytes": 0}
+        )
+        total["count"] += 1
+        total["seconds"] += s["seconds"]
+        total["rows"] += s["attrs"].get("rows", 0)
+        total["bytes"] += s["attrs"].get("bytes", 0)
+        if "memory_delta" in s["attrs"]:
+            total["memory_delta"] = (
+                total.get("memory_delta", 0) + s["attrs"]["memory_delta"]
+            )
+    return totals
+
+
+def print_summary():
+    print(f"{'span':<24}{'count':>7}{'seconds':>10}{'rows':>10}{'MB':>9}{'mem MB':>9}")
+    for name, total in summary().items():
+        memory = total.get("memory_delta")
+        memory = "" if memory is None else f"{memory / 2**20:.1f}"
+        print(
+            f"{name:<24}{total['count']:>7}{total['seconds']:>10.3f}"
+            f"{total['rows']:>10}{total['bytes'] / 2**20:>9.1f}{memory:>9}"
+        )
@@ -1,60 +1,659 @@
-import requests
-from api_key import CMC_API_KEY
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
 import pandas as pd
 
+from field_index import FieldIndex
+from figures import LENDING_PROTOCOLS, REPO_MNEMONICS
+from panel import StablecoinPanel
+from store import INDEX_COLUMN, load_columns, load_table
+from timeseries import TimeSeries, align
+from tracing import span
+
+CMC_URL = "https://pro-api.coinmarketcap.com/v3/cryptocurrency/quotes/historical"
+OFR_URL = "https://data.financialresearch.gov/v1/series/multifull"
+FRED_URL = "https://fred.stlouisfed.org/graph/fredgraph.csv"
+API_URLS = {"cmc": CMC_URL, "ofr": OFR_URL, "fred": FRED_URL}
+CMC_PAGE_DAYS = 365
+# CMC rate limits are per minute; the Basic plan allows 30 calls
+CMC_CALLS_PER_MINUTE = 30
+CMC_MAX_RETRIES = 5
+CMC_BACKOFF_SECONDS = 2
+
+# On-disk response cache shared by the CMC, OFR and FRED fetchers
+CACHE_DIR = "../data/cache"
+CACHE_TTL = 24 * 60 * 60
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Inputs kept in memory so figures built in one process load them once
+_memory_cache = {}
+_input_store = {}
+_cache_lock = threading.RLock()
+
+
+def _cache_index_path():
+    return os.path.join(CACHE_DIR, "index.json")
+
+
+def _load_cache_index():
+    try:
+        with open(_cache_index_path()) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_cache_index(index):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _cache_index_path() + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, _cache_index_path())
+
+
+def _cache_date(date):
+    if date is None:
+        return None
+    return pd.Timestamp(date).strftime("%Y-%m-%d")
+
+
+def _share(data):
+    # Frames whose arrays are read-only, such as those mapped from the data
+    # plane, are handed out as views. The shallow copy keeps column changes
+    # local; in-place writes either copy the column first or fail, so they
+    # never reach other readers
+    if isinstance(data, pd.DataFrame) and not any(
+        data.iloc[:, i].to_numpy().flags.writeable for i in range(data.shape[1])
+    ):
+        return data.copy(deep=False)
+    return data.copy()
+
+
+def _range_covers(entry, start, end):
+    # None stands for an open end of the range
+    start_ok = entry["start"] is None or (start is not None and entry["start"] <= start)
+    end_ok = entry["end"] is None or (end is not None and end <= entry["end"])
+    return start_ok and end_ok
+
+
+def _remove_cache_entry(index, key):
+    entry = index.pop(key)
+    try:
+        os.remove(os.path.join(CACHE_DIR, entry["file"]))
+    except FileNotFoundError:
+        pass
+
+
+def _evict_cache(index, now, ttl, max_bytes):
+    for key in [k for k, e in index.items() if now - e["created"] > ttl]:
+        _remove_cache_entry(index, key)
+    # Drop least recently used entries until the cache fits
+    total = sum(e["size"] for e in index.values())
+    for key in sorted(index, key=lambda k: index[k]["accessed"]):
+        if total <= max_bytes:
+            break
+        total -= index[key]["size"]
+        _remove_cache_entry(index, key)
+
+
+def _remember_fetch(provider, series, entry, data):
+    _memory_cache.setdefault((provider, series), []).append(
+        ({"start": entry["start"], "end": entry["end"]}, data)
+    )
+
+
+def preload_fetch(provider, series, data, start_date=None, end_date=None):
+    # Serve later fetches of this series from memory, e.g. offline stand-ins
+    entry = {"start": _cache_date(start_date), "end": _cache_date(end_date)}
+    _remember_fetch(provider, series, entry, data)
+
+
+def reset_inputs():
+    _memory_cache.clear()
+    _input_store.clear()
+
+
+def shared_inputs():
+    # Everything loaded so far as (tag, data) pairs with JSON-serializable
+    # tags, for publishing to worker processes through the data plane
+    tagged = [(["input", key], data) for key, data in _input_store.items()]
+    for (provider, series), entries in _memory_cache.items():
+        tagged += [
+            (["fetch", provider, series, entry], data) for entry, data in entries
+        ]
+    return tagged
+
+
+def _as_key(tag):
+    # JSON turns key tuples into lists
+    return tuple(_as_key(t) for t in tag) if isinstance(tag, list) else tag
+
+
+def install_inputs(tagged):
+    # The reverse of shared_inputs, e.g. with views attached in a worker.
+    # Replaces what the process holds, such as copies inherited by fork
+    reset_inputs()
+    for tag, data in tagged:
+        if tag[0] == "input":
+            _input_store[_as_key(tag[1])] = data
+        else:
+            _remember_fetch(tag[1], tag[2], tag[3], data)
+
+
+def load_input(key, loader):
+    if key not in _input_store:
+        _input_store[key] = loader()
+    return _share(_input_store[key])
+
+
+def read_table(name, columns=None, start_date=None, end_date=None):
+    # Reads go through the typed column store rather than re-parsing the CSV
+    return load_input(
+        ("table", name, repr(columns), str(start_date), str(end_date)),
+        lambda: load_table(name, columns, start_date, end_date),
+    )
+
+
+def read_other_data_source():
+    return read_table("other_data_source", columns=["Fields", "Value", "As_of"])
+
+
+def read_field_index():
+    # other_data_source grouped by field once per process
+    return load_input(
+        ("index", "other_data_source"),
+        lambda: FieldIndex(read_other_data_source()),
+    )
+
+
+def cached_fetch(
+    provider, series, start_date, end_date, fetch, ttl=None, max_bytes=None
+):
+    with span("fetch", provider=provider, series=series) as s:
+        data, source = _cached_fetch(
+            provider, series, start_date, end_date, fetch, ttl, max_bytes
+        )
+        s.set(rows=len(data), source=source)
+    return data
+
+
+def _cached_fetch(provider, series, start_date, end_date, fetch, ttl, max_bytes):
+    ttl = CACHE_TTL if ttl is None else ttl
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    start, end = _cache_date(start_date), _cache_date(end_date)
+    for entry, data in _memory_cache.get((provider, series), []):
+        if _range_covers(entry, start, end):
+            return _share(data.loc[start:end]), "memory"
+
+    with _cache_lock:
+        now = time.time()
+        index = _load_cache_index()
+
+        # Serve from any fresh entry whose range contains the requested one
+        for key, entry in index.items():
+            if entry["provider"] != provider or entry["series"] != series:
+                continue
+            if now - entry["created"] > ttl or not _range_covers(entry, start, end):
+                continue
+            try:
+                data = pd.read_pickle(os.path.join(CACHE_DIR, entry["file"]))
+            except FileNotFoundError:
+                continue
+            entry["accessed"] = now
+            _save_cache_index(index)
+            _remember_fetch(provider, series, entry, data)
+            return data.loc[start:end].copy(), "disk"
+
+    data = fetch(start_date, end_date)
+    with _cache_lock:
+        _store_cache_entry(provider, series, start, end, data, ttl, max_bytes)
+    _remember_fetch(provider, series, {"start": start, "end": end}, data)
+    return data.copy(), "network"
+
+
+def _store_cache_entry(provider, series, start, end, data, ttl, max_bytes):
+    now = time.time()
+    index = _load_cache_index()
+
+    # Store the new range and drop the entries it supersedes
+    key = f"{provider}|{series}|{start}|{end}"
+    for old_key in [
+        k
+        for k, e in index.items()
+        if e["provider"] == provider
+        and e["series"] == series
+        and _range_covers({"start": start, "end": end}, e["start"], e["end"])
+    ]:
+        _remove_cache_entry(index, old_key)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    file_name = hashlib.sha1(key.encode()).hexdigest() + ".pkl"
+    data.to_pickle(os.path.join(CACHE_DIR, file_name))
+    index[key] = {
+        "provider": provider,
+        "series": series,
+        "start": start,
+        "end": end,
+        "file": file_name,
+        "size": os.path.getsize(os.path.join(CACHE_DIR, file_name)),
+        "created": now,
+        "accessed": now,
+    }
+    _evict_cache(index, now, ttl, max_bytes)
+    _save_cache_index(index)
+
+
+def api_url(provider):
+    # API_BASE_URL points every fetcher at one host, e.g. standin_server.py,
+    # which serves each provider under its own prefix
+    base_url = os.environ.get("API_BASE_URL")
+    if not base_url:
+        return API_URLS[provider]
+    return f"{base_url.rstrip('/')}/{provider}{urlsplit(API_URLS[provider]).path}"
+
+
+def _request_fred_csv(series, start_date, end_date):
+    # Same request and parsing as pandas_datareader's FRED reader
+    response = http_get(api_url("fred"), {"id": series})
+    if response.status_code != 200:
+        raise RuntimeError(f"Request failed with status code: {response.status_code}")
+    data = pd.read_csv(
+        io.StringIO(response.text), index_col=0, parse_dates=True, na_values="."
+    )
+    data.columns = [series]
+    data.index.name = "DATE"
+    return data.loc[pd.Timestamp(start_date) : pd.Timestamp(end_date)]
+
+
+def fetch_fred_data(series, start_date, end_date):
+    def fetch(start_date, end_date):
+        if os.environ.get("API_BASE_URL"):
+            return _request_fred_csv(series, start_date, end_date)
+        import pandas_datareader.data as web
+
+        return web.DataReader(series, "fred", start_date, end_date)
+
+    return cached_fetch("fred", series, start_date, end_date, fetch)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute if capacity is None else capacity
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        # 0 when a token was taken, otherwise the seconds until one is free
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
 
-def download_cmc_data(symbol):
-    url = "https://pro-api.coinmarketcap.com/v3/cryptocurrency/quotes/historical"
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+
+_cmc_bucket = TokenBucket(CMC_CALLS_PER_MINUTE)
+_cmc_session = None
+_http_session = None
+
+
+def _get_cmc_session():
+    global _cmc_session
+    if _cmc_session is None:
+        # Create a api_key.py file in the same directory and add your CMC API key
+        from api_key import CMC_API_KEY
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # One pooled session shared by all download threads
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=16)
+        session.mount("https://", adapter)
+        session.headers.update(
+            {"X-CMC_PRO_API_KEY": CMC_API_KEY, "Accepts": "application/json"}
+        )
+        _cmc_session = session
+    return _cmc_session
+
+
+def _get_with_retry(session, url, params, bucket=None):
+    for attempt in range(CMC_MAX_RETRIES + 1):
+        if bucket is not None:
+            bucket.acquire()
+        with span("http", url=url, attempt=attempt) as s:
+            response = session.get(url, params=params)
+            s.set(status=response.status_code, bytes=len(response.content))
+        if response.status_code != 429 and response.status_code < 500:
+            return response
+        if attempt == CMC_MAX_RETRIES:
+            break
+        # Honour Retry-After on 429s, otherwise back off exponentially
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            delay = int(retry_after)
+        else:
+            delay = CMC_BACKOFF_SECONDS * 2**attempt
+        print(f"Retrying {url} in {delay}s (status {response.status_code})")
+        time.sleep(delay)
+    return response
+
+
+def http_get(url, params):
+    global _http_session
+    if _http_session is None:
+        # requests is imported on first use, so offline builds never load it
+        import requests
+
+        # Keyless FRED and OFR requests share one pooled session
+        _http_session = requests.Session()
+    return _get_with_retry(_http_session, url, params)
+
+
+def _request_cmc_page(symbol, time_start, time_end):
     params = {
         "symbol": "{}".format(symbol),
         "interval": "daily",
-        "count": 1825,
+        "time_start": time_start.strftime("%Y-%m-%d"),
+        "time_end": time_end.strftime("%Y-%m-%d"),
+        "count": CMC_PAGE_DAYS + 1,
         "convert": "USD",
         "aux": "volume,market_cap",
     }
     print(params)
-    # Add the API key to the headers
-    headers = {"X-CMC_PRO_API_KEY": CMC_API_KEY, "Accepts": "application/json"}
 
-    # Make the request
-    response = requests.get(url, params=params, headers=headers)
+    # Make the request; the session carries the API key headers
+    response = _get_with_retry(_get_cmc_session(), api_url("cmc"), params, _cmc_bucket)
     # Check if the request was successful
-    if response.status_code == 200:
-        data = response.json()
-        store_data = []
-        quotes = data["data"]["{}".format(symbol)][0]["quotes"]
-        for i in quotes:
-            temp = pd.DataFrame(
-                {
-                    "{}_volume".format(symbol): [i["quote"]["USD"]["volume_24h"]],
-                    "{}_market_cap".format(symbol): [i["quote"]["USD"]["market_cap"]],
-                },
-                index=[i["timestamp"]],
-            )
-            store_data.append(temp)
-        agg_data = pd.concat(store_data, axis=0)
-        agg_data.index = pd.to_datetime(pd.to_datetime(agg_data.index).date)
-        agg_data.sort_index(inplace=True)
-        # Remove 0 market cap data
-        agg_data = agg_data.loc[agg_data["{}_market_cap".format(symbol)] != 0]
-        # Fill NA
-        agg_data.fillna(method="ffill", inplace=True)
-        return agg_data
-    else:
-        raise (f"Request failed with status code: {response.status_code}")
-
-
-def download_data():
-    symbol_list = ["USDC", "USDT", "BUSD"]
-    for symbol in symbol_list:
-        data = download_cmc_data(symbol)
-        data.to_csv(f"../data/{symbol}_data.csv")
+    if response.status_code != 200:
+        raise RuntimeError(f"Request failed with status code: {response.status_code}")
+    return response.json()["data"]["{}".format(symbol)][0]["quotes"]
+
+
+def _parse_cmc_quotes(symbol, quotes):
+    # Single pass over the payload into column arrays
+    timestamps = [None] * len(quotes)
+    volume = [None] * len(quotes)
+    market_cap = [None] * len(quotes)
+    for i, quote in enumerate(quotes):
+        usd = quote["quote"]["USD"]
+        timestamps[i] = quote["timestamp"]
+        volume[i] = usd["volume_24h"]
+        market_cap[i] = usd["market_cap"]
+    index = pd.to_datetime(timestamps, utc=True).tz_convert(None).normalize()
+    return pd.DataFrame(
+        {
+            "{}_volume".format(symbol): np.array(volume, dtype="float64"),
+            "{}_market_cap".format(symbol): np.array(market_cap, dtype="float64"),
+        },
+        index=index,
+    )
+
+
+def _request_cmc_quotes(symbol, start_date, end_date):
+    # Page through the range in CMC_PAGE_DAYS chunks
+    pages = []
+    page_start = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    while page_start <= end_date:
+        page_end = min(page_start + pd.Timedelta(days=CMC_PAGE_DAYS - 1), end_date)
+        quotes = _request_cmc_page(symbol, page_start, page_end + pd.Timedelta(days=1))
+        pages.append(_parse_cmc_quotes(symbol, quotes))
+        page_start = page_end + pd.Timedelta(days=1)
+    agg_data = pd.concat(pages, axis=0)
+    # Pages overlap by a day at their edges
+    agg_data = agg_data.loc[~agg_data.index.duplicated(keep="last")]
+    agg_data.sort_index(inplace=True)
+    return agg_data.loc[pd.Timestamp(start_date) : end_date]
+
+
+def download_cmc_data(symbol, start_date=None, end_date=None):
+    # Defaults to the trailing 1825 days up to today
+    end_date = datetime.date.today() if end_date is None else end_date
+    if start_date is None:
+        start_date = pd.Timestamp(end_date) - pd.Timedelta(days=1824)
+    agg_data = cached_fetch(
+        "cmc",
+        symbol,
+        start_date,
+        end_date,
+        lambda start, end: _request_cmc_quotes(symbol, start, end),
+    )
+    # Remove 0 market cap data
+    agg_data = agg_data.loc[agg_data["{}_market_cap".format(symbol)] != 0]
+    # Fill NA
+    agg_data.fillna(method="ffill", inplace=True)
+    return agg_data
+
+
+def write_csv_atomic(data, path, **kwargs):
+    # Readers never see a partially written file
+    tmp_path = f"{path}.tmp"
+    data.to_csv(tmp_path, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def append_csv_atomic(data, path):
+    # Rows are appended to a copy that replaces the file, so an interrupted
+    # refresh never leaves a truncated last row
+    tmp_path = f"{path}.tmp"
+    shutil.copyfile(path, tmp_path)
+    data.to_csv(tmp_path, mode="a", header=False)
+    os.replace(tmp_path, path)
+
+
+def _read_last_csv_row(path):
+    # Only the header and the final line are read, however long the file is
+    with open(path, "rb") as f:
+        header = f.readline().decode()
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b""
+        while position > 0 and tail.rstrip(b"\n").count(b"\n") < 1:
+            step = min(4096, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+    last_line = tail.rstrip(b"\n").split(b"\n")[-1].decode()
+    if last_line == header.rstrip("\n"):
+        return None
+    return pd.read_csv(io.StringIO(header + last_line), index_col=0, parse_dates=True)
+
+
+def refresh_cmc_data(symbol, end_date=None):
+    path = f"../data/{symbol}_data.csv"
+    last_row = _read_last_csv_row(path) if os.path.exists(path) else None
+    if last_row is None:
+        data = download_cmc_data(symbol, None, end_date)
+        write_csv_atomic(data, path)
+        return len(data)
+
+    end_date = datetime.date.today() if end_date is None else end_date
+    start_date = last_row.index[-1] + pd.Timedelta(days=1)
+    if start_date > pd.Timestamp(end_date):
+        return 0
+    new_data = download_cmc_data(symbol, start_date, end_date)
+
+    # Forward fill across the boundary with the last stored row only
+    new_data = pd.concat([last_row, new_data], axis=0).ffill().iloc[1:]
+    if len(new_data):
+        append_csv_atomic(new_data, path)
+    return len(new_data)
+
+
+def _download_symbol(symbol, start_date, end_date, incremental=False):
+    if incremental:
+        return f"{symbol} (+{refresh_cmc_data(symbol, end_date)} rows)"
+    data = download_cmc_data(symbol, start_date, end_date)
+    write_csv_atomic(data, f"../data/{symbol}_data.csv")
+    return symbol
+
+
+def download_data(
+    start_date=None, end_date=None, symbol_list=None, max_workers=4, incremental=False
+):
+    symbol_list = ["USDC", "USDT", "BUSD"] if symbol_list is None else symbol_list
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_download_symbol, symbol, start_date, end_date, incremental)
+            for symbol in symbol_list
+        ]
+        for future in futures:
+            print(f"Saved {future.result()}")
+
+
+def read_series(name):
+    # Date-indexed table as a shared, read-only TimeSeries
+    def load():
+        with span("load_series", table=name) as s:
+            columns = load_columns(name)
+            series = TimeSeries(columns.pop(INDEX_COLUMN), columns)
+            s.set(rows=len(series), bytes=series.nbytes)
+        return series
+
+    return load_input(("series", name), load)
+
+
+def fetch_cmc_series(symbol):
+    return read_series(f"{symbol}_data")
+
+
+def read_cmc_rows(symbol, start_date=None, end_date=None):
+    # Only the rows in the date range, read with the store's date pushdown
+    # and not kept in memory, e.g. the days added since a streaming refresh
+    columns = load_columns(f"{symbol}_data", start_date=start_date, end_date=end_date)
+    return TimeSeries(columns.pop(INDEX_COLUMN), columns)
 
 
 def fetch_cmc_data(symbol):
-    data = pd.read_csv(f"../data/{symbol}_data.csv", index_col=0, parse_dates=True)
+    data = fetch_cmc_series(symbol).to_frame()
     return data
 
 
+def read_stablecoin_panel(symbols):
+    # Many stablecoins on one calendar, built once per list of symbols
+    symbols = list(symbols)
+    return load_input(
+        ("panel", tuple(symbols)),
+        lambda: StablecoinPanel.from_series(
+            symbols, [fetch_cmc_series(symbol) for symbol in symbols]
+        ),
+    )
+
+
+def fetch_trading_stablecoins():
+    return trading_stablecoins(fetch_cmc_series("USDT"), fetch_cmc_series("BUSD"))
+
+
+def trading_stablecoins(usdt, busd):
+    # USDT and BUSD on one calendar, with missing values counted as zero
+    ts = align([usdt, busd]).fillna(0)
+    return ts.assign(
+        ts_market_cap=ts["USDT_market_cap"] + ts["BUSD_market_cap"],
+        ts_volume=ts["USDT_volume"] + ts["BUSD_volume"],
+    )
+
+
+def _download_repo_market_data(start_date, end_date):
+    # fetch repo data
+    url = api_url("ofr")
+    params = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "mnemonics": REPO_MNEMONICS,
+    }
+    response = http_get(url, params)
+    data = response.json()
+
+    # clean data
+    tri = pd.DataFrame(data["REPO-TRI_TV_TOT-P"]["timeseries"]["aggregation"])
+    tri = tri.rename({0: "date", 1: "tri value"}, axis=1)
+
+    dvp = pd.DataFrame(data["REPO-DVP_TV_TOT-P"]["timeseries"]["aggregation"])
+    dvp = dvp.rename({0: "date", 1: "dvp value"}, axis=1)
+
+    gcf = pd.DataFrame(data["REPO-GCF_TV_TOT-P"]["timeseries"]["aggregation"])
+    gcf = gcf.rename({0: "date", 1: "gcf value"}, axis=1)
+
+    # merge dfs
+    repo = tri.merge(dvp, on=["date"], how="left")
+    repo = repo.merge(gcf, on=["date"], how="left")
+
+    # to_datetime
+    repo["date"] = pd.to_datetime(repo["date"])
+    repo.set_index("date", inplace=True)
+    repo.sort_index(inplace=True)
+    return repo
+
+
+def fetch_repo_market_data(start_date="2022-04-01", end_date="2023-03-31"):
+    # Cache the raw series so sub-ranges are filled exactly like a fresh download
+    repo = cached_fetch(
+        "ofr", REPO_MNEMONICS, start_date, end_date, _download_repo_market_data
+    )
+
+    # fillna
+    repo = repo.fillna(method="ffill")
+
+    # create total column
+    repo["total value"] = repo["tri value"] + repo["dvp value"] + repo["gcf value"]
+    return repo
+
+
+def read_lending_pools(
+    symbols=("USDC",), protocols=LENDING_PROTOCOLS, start_date=None, end_date=None
+):
+    # Debt per protocol and the total, one row per symbol and day. Only the
+    # requested symbols and dates are read from each protocol table
+    frames = []
+    for protocol in protocols:
+        columns = load_columns(
+            protocol,
+            ["symbol", "ds", "current_variable_debt"],
+            start_date,
+            end_date,
+            where={"symbol": symbols},
+        )
+        frames.append(pd.DataFrame(columns).assign(protocol=protocol))
+    debt = (
+        pd.concat(frames, ignore_index=True)
+        .set_index(["symbol", "ds", "protocol"])["current_variable_debt"]
+        .unstack("protocol")
+        .reindex(columns=list(protocols))
+        .fillna(0)
+    )
+    debt.columns = [f"{protocol}_debt" for protocol in protocols]
+    debt["debt_outstanding"] = 0.0
+    for protocol in protocols:
+        debt["debt_outstanding"] += debt[f"{protocol}_debt"]
+    return debt.reset_index()
+
+
+def read_lending_pool_data():
+    # The USDC frame is shared by the leverage figures, so build it once
+    return load_input(("lending_pools", "USDC"), read_lending_pools)
+
+
 if __name__ == "__main__":
-    download_data()
+    download_data(incremental="--incremental" in sys.argv)
@@ -0,0 +1,215 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from event_logs import event_days, event_files, read_event_chunks
+
+# Local version of sql/figure4_bigquery_wallet_to_wallet_transfer.sql.
+# Transfer and transaction partitions share file names, and a transaction's
+# transfers never span two partitions (true for block or date partitioning)
+USDC = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+USDT = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+TRANSFER_COLUMNS = [
+    "token_address",
+    "from_address",
+    "to_address",
+    "value",
+    "transaction_hash",
+    "block_timestamp",
+]
+
+# Address sets shared with each worker process once, through the initializer
+_worker_sets = {}
+
+
+def address_array(addresses):
+    # 0x-prefixed hex addresses packed into 20-byte values; invalid ones are flagged
+    addresses = pd.Series(addresses).fillna("").astype(str).str.lower()
+    valid = ((addresses.str.len() == 42) & addresses.str.startswith("0x")).to_numpy()
+    raw = addresses.where(valid, "0x" + "0" * 40).to_numpy(dtype="S42")
+    chars = raw.view(np.uint8).reshape(-1, 42)[:, 2:].astype(np.int16)
+    nibbles = np.where(chars >= ord("a"), chars - ord("a") + 10, chars - ord("0"))
+    packed = ((nibbles[:, 0::2] << 4) | nibbles[:, 1::2]).astype(np.uint8)
+    return np.ascontiguousarray(packed).view("S20").ravel(), valid
+
+
+def address_set(addresses):
+    packed, valid = address_array(addresses)
+    return np.unique(packed[valid])
+
+
+def is_member(sorted_set, packed, valid):
+    if not len(sorted_set):
+        return np.zeros(len(packed), dtype=bool)
+    positions = np.searchsorted(sorted_set, packed).clip(max=len(sorted_set) - 1)
+    return valid & (sorted_set[positions] == packed)
+
+
+def load_address_sets(contracts_dir, labels_path):
+    contracts = np.unique(
+        np.concatenate(
+            [
+                address_set(chunk["address"])
+                for chunk in read_event_chunks(
+                    event_files(contracts_dir, ""), ["address"], 10_000_000
+                )
+            ]
+            or [np.array([], dtype="S20")]
+        )
+    )
+    labels = pd.read_csv(labels_path, usecols=["address", "vertical", "subvertical"])
+    exchange_and_vasps = labels.loc[
+        (labels["vertical"] == "Exchanges and VASPs")
+        & labels["address"].str.startswith("0x")
+        & (labels["address"].str.len() == 42),
+        "address",
+    ]
+    exchanges = labels.loc[labels["subvertical"] == "Exchanges", "address"]
+    return {
+        "contracts": contracts,
+        "exchange_and_vasps": address_set(exchange_and_vasps),
+        "exchanges": address_set(exchanges),
+    }
+
+
+def _init_worker(sets):
+    _worker_sets.update(sets)
+
+
+def _find_deposit_addresses(path, end_day, chunksize):
+    # Senders into an exchange, over USDC/USDT/WETH, with no smart contract side
+    found = []
+    for chunk in read_event_chunks([path], TRANSFER_COLUMNS, chunksize):
+        tokens = chunk["token_address"].str.lower()
+        keep = (event_days(chunk["block_timestamp"]) <= end_day) & tokens.isin(
+            [USDC, USDT, WETH]
+        ).to_numpy()
+        chunk = chunk.loc[keep]
+        from_packed, from_valid = address_array(chunk["from_address"])
+        to_packed, to_valid = address_array(chunk["to_address"])
+        keep = (
+            is_member(_worker_sets["exchanges"], to_packed, to_valid)
+            & ~is_member(_worker_sets["contracts"], from_packed, from_valid)
+            & ~is_member(_worker_sets["contracts"], to_packed, to_valid)
+            & from_valid
+        )
+        found.append(np.unique(from_packed[keep]))
+    return np.unique(np.concatenate(found or [np.array([], dtype="S20")]))
+
+
+def _direct_usdc_calls(path, chunksize):
+    hashes = [
+        chunk.loc[chunk["to_address"].str.lower() == USDC, "hash"]
+        for chunk in read_event_chunks([path], ["hash", "to_address"], chunksize)
+    ]
+    return set(pd.concat(hashes)) if hashes else set()
+
+
+def _classify_partition(path, transactions_path, end_day, chunksize):
+    direct_calls = _direct_usdc_calls(transactions_path, chunksize)
+    excluded = [
+        _worker_sets["exchange_and_vasps"],
+        _worker_sets["deposit_addresses"],
+    ]
+    frames = []
+    for chunk in read_event_chunks([path], TRANSFER_COLUMNS, chunksize):
+        days = event_days(chunk["block_timestamp"])
+        tokens = chunk["token_address"].str.lower()
+        keep = (days <= end_day) & (tokens == USDC).to_numpy()
+        chunk, days = chunk.loc[keep], days[keep]
+        from_packed, from_valid = address_array(chunk["from_address"])
+        to_packed, to_valid = address_array(chunk["to_address"])
+        keep = np.ones(len(chunk), dtype=bool)
+        for sorted_set in excluded:
+            keep &= ~is_member(sorted_set, from_packed, from_valid)
+            keep &= ~is_member(sorted_set, to_packed, to_valid)
+        chunk, days = chunk.loc[keep], days[keep]
+        frames.append(
+            pd.DataFrame(
+                {
+                    "ds": days,
+                    "w2w_transfer": chunk["transaction_hash"]
+                    .isin(direct_calls)
+                    .to_numpy(dtype="int64"),
+                    "transfer_value": pd.to_numeric(chunk["value"], errors="coerce")
+                    .astype("float64")
+                    .to_numpy()
+                    / 1.0e6,
+                    "transaction_hash": chunk["transaction_hash"].to_numpy(),
+                }
+            )
+        )
+    if not frames:
+        return None
+    transfers = pd.concat(frames, ignore_index=True)
+    daily = transfers.groupby(["ds", "w2w_transfer"]).agg(
+        transfer_value=("transfer_value", "sum"),
+        txn_cnt=("transaction_hash", "nunique"),
+    )
+    return daily
+
+
+def classify_wallet_transfers(
+    transfers_dir,
+    transactions_dir,
+    contracts_dir,
+    labels_path,
+    end_date="2023-03-31",
+    max_workers=None,
+    chunksize=1_000_000,
+):
+    end_day = int(np.datetime64(pd.Timestamp(end_date).date(), "D").astype("int64"))
+    partitions = event_files(transfers_dir, "")
+    sets = load_address_sets(contracts_dir, labels_path)
+
+    # Pass 1: exchange deposit addresses
+    with ProcessPoolExecutor(
+        max_workers, initializer=_init_worker, initargs=(sets,)
+    ) as executor:
+        found = list(
+            executor.map(
+                _find_deposit_addresses,
+                partitions,
+                [end_day] * len(partitions),
+                [chunksize] * len(partitions),
+            )
+        )
+    sets["deposit_addresses"] = np.unique(
+        np.concatenate(found or [np.array([], dtype="S20")])
+    )
+
+    # Pass 2: anti-join and aggregate by day and direct-contract flag
+    with ProcessPoolExecutor(
+        max_workers, initializer=_init_worker, initargs=(sets,)
+    ) as executor:
+        partials = list(
+            executor.map(
+                _classify_partition,
+                partitions,
+                [
+                    os.path.join(transactions_dir, os.path.basename(path))
+                    for path in partitions
+                ],
+                [end_day] * len(partitions),
+                [chunksize] * len(partitions),
+            )
+        )
+    partials = [partial for partial in partials if partial is not None]
+    if not partials:
+        return pd.DataFrame(columns=["ds", "w2w_transfer", "transfer_value", "txn_cnt"])
+    daily = pd.concat(partials).groupby(level=["ds", "w2w_transfer"]).sum()
+    daily = daily.reset_index()
+    daily["ds"] = (
+        daily["ds"].to_numpy().astype("datetime64[D]").astype("datetime64[ns]")
+    )
+    return daily
+
+
+if __name__ == "__main__":
+    # python wallet_transfers.py transfers_dir transactions_dir contracts_dir labels.csv
+    daily = classify_wallet_transfers(*sys.argv[1:5])
+    print(daily.groupby("w2w_transfer")[["transfer_value", "txn_cnt"]].sum())
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+ONE_DAY = np.timedelta64(1, "D")
+
+
+class WindowIndex:
+    # Prefix sums and counts of daily series on a dense calendar, so the mean
+    # over any date window is two lookups and a division
+    def __init__(self, frame):
+        frame = frame.sort_index()
+        self.frame = frame
+        self.columns = list(frame.columns)
+        self.first_day = frame.index.min().normalize().to_datetime64()
+        days = (frame.index.normalize().to_numpy() - self.first_day) // ONE_DAY
+        self.n_days = int(days.max()) + 1
+
+        values = frame.to_numpy(dtype="float64")
+        valid = ~np.isnan(values)
+        daily_values = np.zeros((self.n_days, len(self.columns)))
+        daily_counts = np.zeros((self.n_days, len(self.columns)))
+        daily_values[days] = np.where(valid, values, 0.0)
+        daily_counts[days] = valid
+        zeros = np.zeros((1, len(self.columns)))
+        self.sums = np.vstack([zeros, np.cumsum(daily_values, axis=0)])
+        self.counts = np.vstack([zeros, np.cumsum(daily_counts, axis=0)])
+
+    def copy(self):
+        # Read-only once built, so the input store can share one instance
+        return self
+
+    def window(self, column, start_date=None, end_date=None):
+        # The daily values behind mean(), e.g. for bootstrap intervals
+        return self.frame[column].loc[start_date:end_date]
+
+    def _offsets(self, start_dates, end_dates):
+        # Inclusive date bounds to prefix positions, clipped to the calendar
+        starts = (
+            pd.to_datetime(start_dates).to_numpy() if start_dates is not None else None
+        )
+        ends = pd.to_datetime(end_dates).to_numpy() if end_dates is not None else None
+        lo = 0 if starts is None else (starts - self.first_day) // ONE_DAY
+        hi = self.n_days if ends is None else (ends - self.first_day) // ONE_DAY + 1
+        lo, hi = np.clip(lo, 0, self.n_days), np.clip(hi, 0, self.n_days)
+        return lo, np.maximum(hi, lo)
+
+    def _column(self, column):
+        return self.columns.index(column)
+
+    def sum(self, column, start_date=None, end_date=None):
+        lo, hi = self._offsets(start_date, end_date)
+        i = self._column(column)
+        return self.sums[hi, i] - self.sums[lo, i]
+
+    def count(self, column, start_date=None, end_date=None):
+        lo, hi = self._offsets(start_date, end_date)
+        i = self._column(column)
+        return self.counts[hi, i] - self.counts[lo, i]
+
+    def mean(self, column, start_date=None, end_date=None):
+        # Same as frame[column].loc[start_date:end_date].mean()
+        lo, hi = self._offsets(start_date, end_date)
+        i = self._column(column)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.sums[hi, i] - self.sums[lo, i]) / (
+                self.counts[hi, i] - self.counts[lo, i]
+            )
+
+    def means(self, column, start_dates, end_dates):
+        # Vectorized over arrays of window bounds, for sensitivity sweeps
+        return self.mean(column, np.asarray(start_dates), np.asarray(end_dates))
+
+    def rollup(self, freq, start_date=None, end_date=None):
+        # Calendar bucket means ("M" or "Y"), labelled like resample(freq).mean()
+        first = pd.Timestamp(self.first_day)
+        last = first + pd.Timedelta(days=self.n_days - 1)
+        start = first if start_date is None else max(first, pd.Timestamp(start_date))
+        end = last if end_date is None else min(last, pd.Timestamp(end_date))
+        periods = pd.period_range(start, end, freq=freq)
+        bucket_starts = np.maximum(periods.start_time.to_numpy(), start.to_datetime64())
+        bucket_ends = np.minimum(
+            periods.end_time.normalize().to_numpy(), end.to_datetime64()
+        )
+        lo, hi = self._offsets(bucket_starts, bucket_ends)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (self.sums[hi] - self.sums[lo]) / (
+                self.counts[hi] - self.counts[lo]
+            )
+        return pd.DataFrame(
+            means,
+            index=periods.end_time.normalize(),
+            columns=self.columns,
+        )